@@ -1,12 +1,22 @@
 import os
 import asyncpg
 import aiosqlite
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import json
 from datetime import datetime
 import asyncio
+import base64
+import binascii
+import time
+from contextlib import asynccontextmanager
 from urllib.parse import urlparse
 
+from .query_cache import QueryCache
+from .raw_store import RawResponseCodec
+from .sqlite_pool import SQLitePool
+from .stats_store import StatisticsStore
+from .write_buffer import WriteBehindBuffer
+
 class LangChainHelper:
     """
     Database interaction helper for pollution analysis records.
@@ -15,6 +25,14 @@ class LangChainHelper:
     Supports both PostgreSQL and SQLite without heavy LangChain dependencies.
     """
     
+    # Columns of pollution_records that /ask may project; raw responses
+    # are loaded separately through get_raw_response()
+    RECORD_COLUMNS = (
+        "id", "timestamp", "transcription", "recognition_service", "latitude", "longitude",
+        "address", "pollution_type", "recommendation", "responsible_agency", "severity_level",
+        "immediate_actions", "long_term_solution", "created_at"
+    )
+    
     def __init__(self, db_url: str = None):
         """
         Initialize database connection.
@@ -43,6 +61,51 @@ class LangChainHelper:
         
         self.db_initialized = False
         
+        # Connection pool settings (shared by PostgreSQL and SQLite pools)
+        self.pool_min_size = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+        self.pool_max_size = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+        self.pool_acquire_timeout = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+        self.pool_command_timeout = float(os.getenv("DB_POOL_COMMAND_TIMEOUT", "30"))
+        self.pool_max_idle_time = float(os.getenv("DB_POOL_MAX_IDLE_TIME", "300"))
+        self.sqlite_pool_size = int(os.getenv("SQLITE_POOL_SIZE", "4"))
+        
+        # Created in initialize_db(), closed in close()
+        self.pool = None
+        self._pool_waiting = 0
+        self._pool_acquisitions = 0
+        self._pool_timeouts = 0
+        self._pool_total_wait = 0.0
+        
+        # Write-behind buffer for batched inserts, started in initialize_db()
+        self.write_buffer = WriteBehindBuffer(
+            self._write_batch,
+            batch_size=int(os.getenv("DB_WRITE_BATCH_SIZE", "100")),
+            flush_interval=float(os.getenv("DB_WRITE_FLUSH_INTERVAL", "0.25")),
+            max_pending=int(os.getenv("DB_WRITE_QUEUE_SIZE", "1000")),
+            max_retries=int(os.getenv("DB_WRITE_MAX_RETRIES", "2"))
+        )
+        
+        # /ask result cache, invalidated whenever this process writes records
+        self.query_cache_enabled = os.getenv("ASK_CACHE_ENABLED", "true").lower() == "true"
+        self.query_cache = QueryCache(
+            max_bytes=int(os.getenv("ASK_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+            ttl=float(os.getenv("ASK_CACHE_TTL", "30"))
+        )
+        
+        # /ask record listings: largest page and rows fetched per cursor round trip
+        self.max_page_size = int(os.getenv("ASK_MAX_PAGE_SIZE", "200"))
+        self.cursor_prefetch = int(os.getenv("ASK_CURSOR_PREFETCH", "50"))
+        
+        # Raw LLM responses live compressed in raw_responses, read only on demand
+        self.raw_codec = RawResponseCodec(
+            os.getenv("RAW_RESPONSE_CODEC", "zlib"),
+            level=int(os.getenv("RAW_RESPONSE_LEVEL")) if os.getenv("RAW_RESPONSE_LEVEL") else None
+        )
+        self.raw_migration_batch = int(os.getenv("RAW_RESPONSE_MIGRATION_BATCH", "500"))
+        
+        # Running aggregates behind /stats, rebuilt in initialize_db()
+        self.statistics = StatisticsStore(window_days=int(os.getenv("STATS_WINDOW_DAYS", "7")))
+        
         # Database schema for pollution records
         self.schema = {
             "pollution_records": """
@@ -75,6 +138,20 @@ class LangChainHelper:
             "timestamp_index": """
                 CREATE INDEX IF NOT EXISTS idx_timestamp 
                 ON pollution_records (timestamp)
+            """,
+            # Keyset pagination of /ask listings walks this index
+            "created_at_index": """
+                CREATE INDEX IF NOT EXISTS idx_created_at_id 
+                ON pollution_records (created_at, id)
+            """,
+            # Compressed audit payloads, kept out of the hot table;
+            # pollution_records.raw_response is only read by the migration
+            "raw_responses": """
+                CREATE TABLE IF NOT EXISTS raw_responses (
+                    record_id INTEGER PRIMARY KEY REFERENCES pollution_records (id) ON DELETE CASCADE,
+                    codec TEXT NOT NULL,
+                    payload BYTEA NOT NULL
+                )
             """
         }
     
@@ -82,40 +159,137 @@ class LangChainHelper:
         """Initialize database with required tables and indexes."""
         
         try:
+            await self._open_pool()
+            
             if self.is_postgres:
                 await self._initialize_postgres()
             else:
                 await self._initialize_sqlite()
             
+            await self._migrate_raw_responses()
+            
+            # Before the write buffer starts, so no insert is counted twice
+            await self._rebuild_statistics()
+            
             self.db_initialized = True
+            self.write_buffer.start()
             print(f"Database initialized: {self.db_url}")
             
         except Exception as e:
             raise RuntimeError(f"Database initialization failed: {str(e)}")
     
+    async def close(self):
+        """Drain pending writes and close the connection pool. Called on application shutdown."""
+        
+        await self.write_buffer.close()
+        
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+        self.db_initialized = False
+    
+    async def _open_pool(self):
+        """Create the PostgreSQL pool or open the SQLite connection set."""
+        
+        if self.pool is not None:
+            return
+        
+        if self.is_postgres:
+            self.pool = await asyncpg.create_pool(
+                **self.pg_config,
+                min_size=min(self.pool_min_size, self.pool_max_size),
+                max_size=self.pool_max_size,
+                timeout=self.pool_acquire_timeout,
+                command_timeout=self.pool_command_timeout,
+                max_inactive_connection_lifetime=self.pool_max_idle_time
+            )
+        else:
+            pool = SQLitePool(
+                self.sqlite_path,
+                size=self.sqlite_pool_size,
+                acquire_timeout=self.pool_acquire_timeout,
+                busy_timeout=self.pool_command_timeout
+            )
+            await pool.open()
+            self.pool = pool
+    
+    @asynccontextmanager
+    async def _connection(self):
+        """Borrow a pooled connection (asyncpg or aiosqlite) for one unit of work."""
+        
+        if self.pool is None:
+            await self._open_pool()
+        
+        if not self.is_postgres:
+            async with self.pool.acquire() as db:
+                yield db
+            return
+        
+        started = time.perf_counter()
+        self._pool_waiting += 1
+        try:
+            conn = await self.pool.acquire(timeout=self.pool_acquire_timeout)
+        except asyncio.TimeoutError:
+            self._pool_timeouts += 1
+            raise RuntimeError(f"Timed out waiting {self.pool_acquire_timeout}s for a PostgreSQL connection")
+        finally:
+            self._pool_waiting -= 1
+        
+        self._pool_acquisitions += 1
+        self._pool_total_wait += time.perf_counter() - started
+        try:
+            yield conn
+        finally:
+            await self.pool.release(conn)
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Report connection pool size and saturation metrics."""
+        
+        if self.pool is None:
+            return {"status": "closed"}
+        
+        if not self.is_postgres:
+            return {"database_type": "SQLite", **self.pool.get_stats()}
+        
+        size = self.pool.get_size()
+        idle = self.pool.get_idle_size()
+        in_use = size - idle
+        return {
+            "database_type": "PostgreSQL",
+            "size": size,
+            "min_size": self.pool.get_min_size(),
+            "max_size": self.pool.get_max_size(),
+            "in_use": in_use,
+            "idle": idle,
+            "waiting": self._pool_waiting,
+            "saturation": round(in_use / self.pool.get_max_size(), 3),
+            "acquisitions": self._pool_acquisitions,
+            "acquire_timeouts": self._pool_timeouts,
+            "avg_wait_ms": round(self._pool_total_wait / self._pool_acquisitions * 1000, 3) if self._pool_acquisitions else 0.0
+        }
+    
     async def _initialize_postgres(self):
         """Initialize PostgreSQL database."""
         
-        conn = await asyncpg.connect(**self.pg_config)
-        try:
+        async with self._connection() as conn:
             # Create tables and indexes
             for name, query in self.schema.items():
                 await conn.execute(query)
-        finally:
-            await conn.close()
     
     async def _initialize_sqlite(self):
         """Initialize SQLite database."""
         
         # Adjust schema for SQLite
         sqlite_schema = {
-            "pollution_records": self.schema["pollution_records"].replace("SERIAL", "INTEGER AUTOINCREMENT").replace("TIMESTAMP", "DATETIME"),
+            "pollution_records": self.schema["pollution_records"].replace("SERIAL PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT").replace("TIMESTAMP DEFAULT", "DATETIME DEFAULT"),
             "location_index": self.schema["location_index"],
             "pollution_type_index": self.schema["pollution_type_index"],
-            "timestamp_index": self.schema["timestamp_index"]
+            "timestamp_index": self.schema["timestamp_index"],
+            "created_at_index": self.schema["created_at_index"],
+            "raw_responses": self.schema["raw_responses"].replace("BYTEA", "BLOB")
         }
         
-        async with aiosqlite.connect(self.sqlite_path) as db:
+        async with self._connection() as db:
             for name, query in sqlite_schema.items():
                 await db.execute(query)
             await db.commit()
@@ -135,105 +309,325 @@ class LangChainHelper:
             await self.initialize_db()
         
         try:
-            # Extract location data
-            location = analysis_data.get("location", {})
-            
-            # Prepare record data
-            record_data = (
-                analysis_data.get("transcription", ""),
-                analysis_data.get("recognition_service", ""),
-                self._safe_float(location.get("latitude")),
-                self._safe_float(location.get("longitude")),
-                location.get("address"),
-                analysis_data.get("pollution_type", ""),
-                analysis_data.get("recommendation", ""),
-                analysis_data.get("responsible_agency", ""),
-                analysis_data.get("severity_level", "medium"),
-                analysis_data.get("immediate_actions", ""),
-                analysis_data.get("long_term_solution", ""),
-                json.dumps(analysis_data.get("raw_cohere_response", {})),
-                datetime.now()
-            )
+            record_data = self._build_record(analysis_data)
             
             if self.is_postgres:
-                return await self._add_to_postgres(record_data)
+                record_id = await self._add_to_postgres(record_data)
             else:
-                return await self._add_to_sqlite(record_data)
+                record_id = await self._add_to_sqlite(record_data)
+            
+            self.query_cache.bump()
+            self._count_records([record_data])
+            return record_id
                 
         except Exception as e:
             raise RuntimeError(f"Failed to add record to database: {str(e)}")
     
+    async def enqueue_record(self, analysis_data: Dict[str, Any]) -> asyncio.Future:
+        """
+        Queue a pollution analysis record for a batched background insert.
+        
+        Returns as soon as the record is buffered; only waits when the
+        buffer is full.
+        
+        Args:
+            analysis_data: Dictionary containing analysis results
+            
+        Returns:
+            Future resolved with the record ID once the batch is written
+        """
+        
+        if not self.db_initialized:
+            await self.initialize_db()
+        
+        return await self.write_buffer.put(self._build_record(analysis_data))
+    
+    def _build_record(self, analysis_data: Dict[str, Any]) -> tuple:
+        """Flatten analysis results into the pollution_records column order."""
+        
+        # Extract location data
+        location = analysis_data.get("location", {})
+        
+        return (
+            analysis_data.get("transcription", ""),
+            analysis_data.get("recognition_service", ""),
+            self._safe_float(location.get("latitude")),
+            self._safe_float(location.get("longitude")),
+            location.get("address"),
+            analysis_data.get("pollution_type", ""),
+            analysis_data.get("recommendation", ""),
+            analysis_data.get("responsible_agency", ""),
+            analysis_data.get("severity_level", "medium"),
+            analysis_data.get("immediate_actions", ""),
+            analysis_data.get("long_term_solution", ""),
+            json.dumps(analysis_data.get("raw_cohere_response", {})),
+            datetime.now()
+        )
+    
+    @staticmethod
+    def _record_columns(record: tuple) -> tuple:
+        """Values for the pollution_records INSERT, without the raw response."""
+        return record[:11] + record[12:]
+    
+    def _raw_rows(self, record_ids: List[int], records: List[tuple]) -> List[tuple]:
+        """Compressed (record_id, codec, payload) rows for raw_responses."""
+        return [
+            (record_id, self.raw_codec.codec, self.raw_codec.encode(record[11]))
+            for record_id, record in zip(record_ids, records)
+        ]
+    
+    async def get_raw_response(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Load the raw LLM response stored for a record.
+        
+        Args:
+            record_id: ID of the pollution record
+            
+        Returns:
+            The raw response, or None if the record has none
+        """
+        
+        if not self.db_initialized:
+            await self.initialize_db()
+        
+        async with self._connection() as conn:
+            if self.is_postgres:
+                row = await conn.fetchrow(
+                    "SELECT codec, payload FROM raw_responses WHERE record_id = $1", record_id
+                )
+            else:
+                cursor = await conn.execute(
+                    "SELECT codec, payload FROM raw_responses WHERE record_id = ?", (record_id,)
+                )
+                row = await cursor.fetchone()
+        
+        if row is None:
+            return None
+        return json.loads(self.raw_codec.decode(row[1], row[0]))
+    
+    async def _migrate_raw_responses(self):
+        """
+        Move inline raw responses from pollution_records into raw_responses.
+        
+        Runs in batches, each in its own transaction, so an interrupted
+        migration resumes where it stopped. SQLite keeps the freed pages
+        until the file is vacuumed.
+        """
+        
+        moved = 0
+        while True:
+            async with self._connection() as conn:
+                if self.is_postgres:
+                    async with conn.transaction():
+                        rows = await conn.fetch("""
+                            SELECT id, raw_response FROM pollution_records
+                            WHERE raw_response IS NOT NULL
+                            ORDER BY id
+                            LIMIT $1
+                        """, self.raw_migration_batch)
+                        if rows:
+                            await conn.executemany(
+                                "INSERT INTO raw_responses (record_id, codec, payload) VALUES ($1, $2, $3) "
+                                "ON CONFLICT (record_id) DO NOTHING",
+                                [(row["id"], self.raw_codec.codec, self.raw_codec.encode(row["raw_response"])) for row in rows]
+                            )
+                            await conn.execute(
+                                "UPDATE pollution_records SET raw_response = NULL WHERE id = ANY($1::int[])",
+                                [row["id"] for row in rows]
+                            )
+                else:
+                    cursor = await conn.execute("""
+                        SELECT id, raw_response FROM pollution_records
+                        WHERE raw_response IS NOT NULL
+                        ORDER BY id
+                        LIMIT ?
+                    """, (self.raw_migration_batch,))
+                    rows = await cursor.fetchall()
+                    if rows:
+                        await conn.executemany(
+                            "INSERT OR IGNORE INTO raw_responses (record_id, codec, payload) VALUES (?, ?, ?)",
+                            [(row[0], self.raw_codec.codec, self.raw_codec.encode(row[1])) for row in rows]
+                        )
+                        await conn.executemany(
+                            "UPDATE pollution_records SET raw_response = NULL WHERE id = ?",
+                            [(row[0],) for row in rows]
+                        )
+                        await conn.commit()
+            
+            if not rows:
+                break
+            moved += len(rows)
+        
+        if moved:
+            print(f"📦 Moved {moved} raw responses to compressed storage")
+    
+    async def _write_batch(self, records: List[tuple]) -> List[int]:
+        """Insert a batch of records in a single round trip."""
+        
+        if self.is_postgres:
+            record_ids = await self._add_many_to_postgres(records)
+        else:
+            record_ids = await self._add_many_to_sqlite(records)
+        
+        self.query_cache.bump()
+        self._count_records(records)
+        print(f"Flushed {len(records)} records to database")
+        return record_ids
+    
+    async def _add_many_to_postgres(self, records: List[tuple]) -> List[int]:
+        """Add a batch of records to PostgreSQL with one multi-row INSERT."""
+        
+        rows_data = [self._record_columns(record) for record in records]
+        
+        # Multi-row VALUES with RETURNING keeps one round trip and still yields IDs,
+        # which executemany/COPY cannot
+        columns = len(rows_data[0])
+        placeholders = ", ".join(
+            "(" + ", ".join(f"${row * columns + col + 1}" for col in range(columns)) + ")"
+            for row in range(len(rows_data))
+        )
+        values = [value for row_data in rows_data for value in row_data]
+        
+        async with self._connection() as conn, conn.transaction():
+            rows = await conn.fetch(f"""
+                INSERT INTO pollution_records 
+                (transcription, recognition_service, latitude, longitude, address,
+                 pollution_type, recommendation, responsible_agency, severity_level,
+                 immediate_actions, long_term_solution, created_at)
+                VALUES {placeholders}
+                RETURNING id
+            """, *values)
+            record_ids = [row["id"] for row in rows]
+            await conn.executemany(
+                "INSERT INTO raw_responses (record_id, codec, payload) VALUES ($1, $2, $3)",
+                self._raw_rows(record_ids, records)
+            )
+            return record_ids
+    
+    async def _add_many_to_sqlite(self, records: List[tuple]) -> List[int]:
+        """Add a batch of records to SQLite in one transaction."""
+        
+        async with self._connection() as db:
+            await db.executemany("""
+                INSERT INTO pollution_records 
+                (transcription, recognition_service, latitude, longitude, address,
+                 pollution_type, recommendation, responsible_agency, severity_level,
+                 immediate_actions, long_term_solution, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [self._record_columns(record) for record in records])
+            
+            # The transaction holds the write lock, so the batch's IDs are contiguous
+            cursor = await db.execute("SELECT last_insert_rowid()")
+            last_id = (await cursor.fetchone())[0]
+            record_ids = list(range(last_id - len(records) + 1, last_id + 1))
+            await db.executemany(
+                "INSERT INTO raw_responses (record_id, codec, payload) VALUES (?, ?, ?)",
+                self._raw_rows(record_ids, records)
+            )
+            await db.commit()
+            return record_ids
+    
     async def _add_to_postgres(self, record_data: tuple) -> int:
         """Add record to PostgreSQL database."""
         
-        conn = await asyncpg.connect(**self.pg_config)
-        try:
+        async with self._connection() as conn, conn.transaction():
             record_id = await conn.fetchval("""
                 INSERT INTO pollution_records 
                 (transcription, recognition_service, latitude, longitude, address,
                  pollution_type, recommendation, responsible_agency, severity_level,
-                 immediate_actions, long_term_solution, raw_response, created_at)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
+                 immediate_actions, long_term_solution, created_at)
+                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
                 RETURNING id
-            """, *record_data)
+            """, *self._record_columns(record_data))
+            await conn.executemany(
+                "INSERT INTO raw_responses (record_id, codec, payload) VALUES ($1, $2, $3)",
+                self._raw_rows([record_id], [record_data])
+            )
             
             print(f"Record added to PostgreSQL with ID: {record_id}")
             return record_id
-        finally:
-            await conn.close()
     
     async def _add_to_sqlite(self, record_data: tuple) -> int:
         """Add record to SQLite database."""
         
-        async with aiosqlite.connect(self.sqlite_path) as db:
+        async with self._connection() as db:
             cursor = await db.execute("""
                 INSERT INTO pollution_records 
                 (transcription, recognition_service, latitude, longitude, address,
                  pollution_type, recommendation, responsible_agency, severity_level,
-                 immediate_actions, long_term_solution, raw_response, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, record_data)
+                 immediate_actions, long_term_solution, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, self._record_columns(record_data))
             
-            await db.commit()
             record_id = cursor.lastrowid
+            await db.executemany(
+                "INSERT INTO raw_responses (record_id, codec, payload) VALUES (?, ?, ?)",
+                self._raw_rows([record_id], [record_data])
+            )
+            await db.commit()
             print(f"Record added to SQLite with ID: {record_id}")
             return record_id
     
-    async def query(self, natural_language_query: str) -> Tuple[str, List[Dict[str, Any]]]:
+    async def query(
+        self,
+        natural_language_query: str,
+        fields: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[str, List[Dict[str, Any]], Optional[str]]:
         """
         Convert natural language query to SQL and execute.
         
+        Questions that list records are paginated newest first by
+        (created_at, id): pass the returned cursor back to get the next
+        page. Aggregate questions ignore the paging arguments.
+        
         Args:
             natural_language_query: Natural language question about the data
+            fields: Columns to return for listed records (None for the default set)
+            limit: Page size for listed records (None for the question's default)
+            cursor: Cursor returned with the previous page
             
         Returns:
-            Tuple of (SQL query, results)
+            Tuple of (SQL query, results, cursor of the next page or None)
+            
+        Raises:
+            ValueError: If a field name or the cursor is invalid
         """
         
+        if fields:
+            unknown = [field for field in fields if field not in self.RECORD_COLUMNS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        after = self._decode_cursor(cursor) if cursor else None
+        
         if not self.db_initialized:
             await self.initialize_db()
         
         try:
             # Use predefined query patterns for common questions
-            sql_query, results = await self._pattern_based_query(natural_language_query)
-            return sql_query, results
+            return await self._pattern_based_query(natural_language_query, fields, limit, after)
             
         except Exception as e:
             # Return error information
-            return f"ERROR: {str(e)}", []
+            return f"ERROR: {str(e)}", [], None
     
-    async def _pattern_based_query(self, query: str) -> Tuple[str, List[Dict[str, Any]]]:
+    async def _pattern_based_query(
+        self,
+        query: str,
+        fields: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, int]] = None
+    ) -> Tuple[str, List[Dict[str, Any]], Optional[str]]:
         """Handle queries using pattern matching."""
         
         query_lower = query.lower()
         
-        # Predefined query patterns
+        # Record listings as (default columns, filter, default page size);
+        # aggregates are plain SQL
+        listing = None
         if "recent" in query_lower or "latest" in query_lower:
-            sql = """
-                SELECT * FROM pollution_records 
-                ORDER BY created_at DESC 
-                LIMIT 10
-            """
+            listing = (self.RECORD_COLUMNS, None, 10)
         elif "count" in query_lower or "total" in query_lower:
             sql = """
                 SELECT 
@@ -260,81 +654,137 @@ class LangChainHelper:
                 ORDER BY count DESC
             """
         elif "location" in query_lower or "address" in query_lower:
-            sql = """
-                SELECT address, pollution_type, created_at
-                FROM pollution_records 
-                WHERE address IS NOT NULL 
-                ORDER BY created_at DESC
-                LIMIT 20
-            """
+            listing = (["address", "pollution_type", "created_at"], "address IS NOT NULL", 20)
         elif "water" in query_lower:
-            sql = """
-                SELECT * FROM pollution_records 
-                WHERE pollution_type LIKE '%water%'
-                ORDER BY created_at DESC
-                LIMIT 20
-            """
+            listing = (self.RECORD_COLUMNS, "pollution_type LIKE '%water%'", 20)
         elif "air" in query_lower:
-            sql = """
-                SELECT * FROM pollution_records 
-                WHERE pollution_type LIKE '%air%'
-                ORDER BY created_at DESC
-                LIMIT 20
-            """
+            listing = (self.RECORD_COLUMNS, "pollution_type LIKE '%air%'", 20)
         elif "severe" in query_lower or "critical" in query_lower or "high" in query_lower:
-            sql = """
-                SELECT * FROM pollution_records 
-                WHERE severity_level IN ('high', 'critical')
-                ORDER BY created_at DESC
-                LIMIT 20
-            """
+            listing = (self.RECORD_COLUMNS, "severity_level IN ('high', 'critical')", 20)
         else:
             # Default: return all records summary
-            sql = """
-                SELECT 
-                    id, timestamp, pollution_type, address, severity_level
-                FROM pollution_records 
-                ORDER BY created_at DESC 
-                LIMIT 50
-            """
+            listing = (["id", "timestamp", "pollution_type", "address", "severity_level"], None, 50)
+        
+        if listing is None:
+            results = await self._execute_cached(sql)
+            return sql, results, None
         
-        results = await self._execute_sql(sql)
-        return sql, results
+        columns, condition, default_limit = listing
+        return await self._list_records(fields or columns, condition, limit or default_limit, after)
     
-    async def _execute_sql(self, sql_query: str) -> List[Dict[str, Any]]:
+    async def _list_records(
+        self,
+        columns: Tuple[str, ...],
+        condition: Optional[str],
+        limit: int,
+        after: Optional[Tuple[Any, int]]
+    ) -> Tuple[str, List[Dict[str, Any]], Optional[str]]:
+        """
+        Fetch one page of records, newest first, by keyset on (created_at, id).
+        
+        Args:
+            columns: Column names to return
+            condition: SQL filter, or None
+            limit: Page size (capped at ASK_MAX_PAGE_SIZE)
+            after: (created_at, id) of the last row of the previous page
+        """
+        
+        limit = max(1, min(limit, self.max_page_size))
+        
+        # The keyset columns are always read, but only returned when asked for
+        extra = [column for column in ("created_at", "id") if column not in columns]
+        select = ", ".join(list(columns) + extra)
+        
+        conditions = [condition] if condition else []
+        params: List[Any] = []
+        if after is not None:
+            placeholders = ("$1", "$2") if self.is_postgres else ("?", "?")
+            conditions.append(f"(created_at, id) < ({placeholders[0]}, {placeholders[1]})")
+            params.extend(after)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        # One extra row tells whether another page exists
+        sql = f"SELECT {select} FROM pollution_records{where} ORDER BY created_at DESC, id DESC LIMIT {limit + 1}"
+        rows = await self._execute_cached(sql, tuple(params))
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        if extra:
+            rows = [{key: value for key, value in row.items() if key not in extra} for row in rows]
+        return sql, rows, next_cursor
+    
+    def _encode_cursor(self, created_at: Any, record_id: int) -> str:
+        """Opaque cursor pointing just past a row."""
+        
+        payload = json.dumps([str(created_at), record_id]).encode("utf-8")
+        return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+    
+    def _decode_cursor(self, cursor: str) -> Tuple[Any, int]:
+        """Decode a cursor into bind values for the keyset comparison."""
+        
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            created_at, record_id = json.loads(base64.urlsafe_b64decode(padded))
+            record_id = int(record_id)
+            # PostgreSQL compares against a TIMESTAMP; SQLite stores the same text it returned
+            if self.is_postgres:
+                created_at = datetime.fromisoformat(created_at)
+            return created_at, record_id
+        except (ValueError, TypeError, binascii.Error):
+            raise ValueError("Invalid cursor")
+    
+    async def _execute_cached(self, sql_query: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """Execute a read query, serving unchanged data from the result cache."""
+        
+        if not self.query_cache_enabled:
+            return await self._execute_sql(sql_query, params)
+        
+        cached = self.query_cache.get(sql_query, params)
+        if cached is not None:
+            return cached
+        
+        # Taken before the read so rows overlapping a write are never cached
+        version = self.query_cache.write_version
+        results = await self._execute_sql(sql_query, params)
+        self.query_cache.set(sql_query, params, [dict(row) for row in results], version)
+        return results
+    
+    async def _execute_sql(self, sql_query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Execute SQL query and return results as list of dictionaries."""
         
         try:
             if self.is_postgres:
-                return await self._execute_postgres_sql(sql_query)
+                return await self._execute_postgres_sql(sql_query, params)
             else:
-                return await self._execute_sqlite_sql(sql_query)
+                return await self._execute_sqlite_sql(sql_query, params)
                 
         except Exception as e:
             raise RuntimeError(f"SQL execution failed: {str(e)}")
     
-    async def _execute_postgres_sql(self, sql_query: str) -> List[Dict[str, Any]]:
+    async def _execute_postgres_sql(self, sql_query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Execute SQL query on PostgreSQL."""
         
-        conn = await asyncpg.connect(**self.pg_config)
-        try:
-            rows = await conn.fetch(sql_query)
-            # Convert asyncpg Records to dictionaries
-            results = [dict(row) for row in rows]
+        async with self._connection() as conn:
+            # Server-side cursor: rows arrive in prefetch-sized chunks and are
+            # converted one at a time instead of as one materialized result
+            results = []
+            async with conn.transaction(readonly=True):
+                async for row in conn.cursor(sql_query, *params, prefetch=self.cursor_prefetch):
+                    results.append(dict(row))
             return results
-        finally:
-            await conn.close()
     
-    async def _execute_sqlite_sql(self, sql_query: str) -> List[Dict[str, Any]]:
+    async def _execute_sqlite_sql(self, sql_query: str, params: tuple = ()) -> List[Dict[str, Any]]:
         """Execute SQL query on SQLite."""
         
-        async with aiosqlite.connect(self.sqlite_path) as db:
-            db.row_factory = aiosqlite.Row  # Enable column access by name
-            cursor = await db.execute(sql_query)
-            rows = await cursor.fetchall()
+        async with self._connection() as db:
+            # Row factory is set per cursor so pooled connections stay tuple-based
+            cursor = await db.execute(sql_query, params)
+            cursor.row_factory = aiosqlite.Row  # Enable column access by name
             
-            # Convert rows to dictionaries
-            results = [dict(row) for row in rows]
+            # Iterate the cursor in chunks rather than fetching every row at once
+            results = [dict(row) async for row in cursor]
             return results
     
     def _safe_float(self, value: Any) -> float:
@@ -348,6 +798,109 @@ class LangChainHelper:
         except (ValueError, TypeError):
             return None
     
+    async def get_training_records(self, limit: int = 5000) -> List[Dict[str, Any]]:
+        """
+        Fetch the most recent classifications for training the local classifier.
+        
+        Args:
+            limit: Maximum number of records returned
+            
+        Returns:
+            Dictionaries with transcription, pollution_type, severity_level and raw_response
+        """
+        
+        if not self.db_initialized:
+            await self.initialize_db()
+        
+        sql = """
+            SELECT p.transcription, p.pollution_type, p.severity_level, r.codec, r.payload
+            FROM pollution_records p
+            LEFT JOIN raw_responses r ON r.record_id = p.id
+            ORDER BY p.id DESC
+            LIMIT {}
+        """
+        async with self._connection() as conn:
+            if self.is_postgres:
+                rows = await conn.fetch(sql.format("$1"), limit)
+            else:
+                cursor = await conn.execute(sql.format("?"), (limit,))
+                rows = await cursor.fetchall()
+        
+        return [
+            {
+                "transcription": row[0],
+                "pollution_type": row[1],
+                "severity_level": row[2],
+                "raw_response": self.raw_codec.decode(row[4], row[3]) if row[4] is not None else None
+            }
+            for row in rows
+        ]
+    
+    def _count_records(self, records: List[tuple]):
+        """Add freshly written records to the running statistics."""
+        
+        for record in records:
+            self.statistics.record(
+                pollution_type=record[5],
+                severity_level=record[8],
+                located=record[2] is not None and record[3] is not None,
+                created_at=record[12]
+            )
+    
+    async def _rebuild_statistics(self):
+        """Recompute the running statistics from the table."""
+        
+        cutoff = datetime.now() - self.statistics.window
+        async with self._connection() as conn:
+            if self.is_postgres:
+                groups = await conn.fetch("""
+                    SELECT pollution_type, severity_level,
+                           (latitude IS NOT NULL AND longitude IS NOT NULL) AS located,
+                           COUNT(*) AS count
+                    FROM pollution_records
+                    GROUP BY 1, 2, 3
+                """)
+                hours = await conn.fetch("""
+                    SELECT date_trunc('hour', created_at) AS hour, COUNT(*) AS count
+                    FROM pollution_records
+                    WHERE created_at > $1
+                    GROUP BY 1
+                """, cutoff)
+                recent_hours = [(row["hour"], row["count"]) for row in hours]
+                groups = [tuple(row) for row in groups]
+            else:
+                cursor = await conn.execute("""
+                    SELECT pollution_type, severity_level,
+                           (latitude IS NOT NULL AND longitude IS NOT NULL) AS located,
+                           COUNT(*) AS count
+                    FROM pollution_records
+                    GROUP BY 1, 2, 3
+                """)
+                groups = [(row[0], row[1], bool(row[2]), row[3]) for row in await cursor.fetchall()]
+                # created_at is stored as ISO text; its first 13 characters name the hour
+                cursor = await conn.execute("""
+                    SELECT substr(created_at, 1, 13) AS hour, COUNT(*) AS count
+                    FROM pollution_records
+                    WHERE created_at > ?
+                    GROUP BY 1
+                """, (cutoff,))
+                recent_hours = []
+                for hour, count in await cursor.fetchall():
+                    try:
+                        recent_hours.append((datetime.strptime(hour, "%Y-%m-%d %H"), count))
+                    except (TypeError, ValueError):
+                        continue
+        
+        self.statistics.rebuild(groups, recent_hours)
+    
+    def get_live_statistics(self) -> Dict[str, Any]:
+        """Statistics from the running aggregates, without touching the database."""
+        
+        return {
+            **self.statistics.snapshot(),
+            "database_type": "PostgreSQL" if self.is_postgres else "SQLite"
+        }
+    
     async def get_statistics(self) -> Dict[str, Any]:
         """Get database statistics and summary information."""
         
@@ -366,8 +919,7 @@ class LangChainHelper:
     async def _get_postgres_statistics(self) -> Dict[str, Any]:
         """Get statistics from PostgreSQL."""
         
-        conn = await asyncpg.connect(**self.pg_config)
-        try:
+        async with self._connection() as conn:
             # Total records
             total_records = await conn.fetchval("SELECT COUNT(*) FROM pollution_records")
             
@@ -400,13 +952,11 @@ class LangChainHelper:
                 "database_url": self.db_url,
                 "database_type": "PostgreSQL"
             }
-        finally:
-            await conn.close()
     
     async def _get_sqlite_statistics(self) -> Dict[str, Any]:
         """Get statistics from SQLite."""
         
-        async with aiosqlite.connect(self.sqlite_path) as db:
+        async with self._connection() as db:
             # Total records
             cursor = await db.execute("SELECT COUNT(*) FROM pollution_records")
             total_records = (await cursor.fetchone())[0]
@@ -0,0 +1,124 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+class QueryCache:
+    """
+    Result cache for read queries, invalidated by writes.
+
+    Entries are keyed on the SQL text plus its parameters and tagged with
+    the write version current when the query started. Every committed
+    write bumps the version, which makes all older entries stale at once,
+    so reads are served from memory exactly until new data arrives. Writes
+    made by other processes are not seen, so entries also expire after a
+    TTL. Memory is bounded by the estimated serialized size of the
+    results, evicting least recently used entries first.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, ttl: float = 30.0):
+        """
+        Args:
+            max_bytes: Total estimated size of cached results
+            ttl: Seconds an entry stays valid without any local write
+        """
+        self.max_bytes = max(0, max_bytes)
+        self.ttl = ttl
+        # A single result may use at most a quarter of the budget
+        self.max_entry_bytes = self.max_bytes // 4
+
+        self.write_version = 0
+        self._entries: "OrderedDict[Tuple[str, tuple], tuple]" = OrderedDict()
+        self._bytes = 0
+
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._evictions = 0
+        self._too_large = 0
+
+    @staticmethod
+    def make_key(sql: str, params: tuple = ()) -> Tuple[str, tuple]:
+        """Whitespace-insensitive key for a statement and its parameters."""
+
+        return " ".join(sql.split()), tuple(params)
+
+    def bump(self):
+        """Record a committed write; every cached result becomes stale."""
+
+        self.write_version += 1
+
+    def get(self, sql: str, params: tuple = ()) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up cached rows.
+
+        Returns:
+            Copy of the cached rows, or None on a miss
+        """
+
+        key = self.make_key(sql, params)
+        entry = self._entries.get(key)
+        if entry is not None:
+            version, expires_at, size, rows = entry
+            if version == self.write_version and expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return [dict(row) for row in rows]
+            self._discard(key)
+            self._stale += 1
+
+        self._misses += 1
+        return None
+
+    def set(self, sql: str, params: tuple, rows: List[Dict[str, Any]], version: int):
+        """
+        Store rows read while the write version was `version`.
+
+        Rows from a query that overlapped a write are dropped rather than
+        cached under the newer version.
+        """
+
+        if version != self.write_version or self.max_bytes == 0:
+            return
+
+        size = self._estimate_size(rows)
+        if size > self.max_entry_bytes:
+            self._too_large += 1
+            return
+
+        key = self.make_key(sql, params)
+        self._discard(key)
+        self._entries[key] = (version, time.monotonic() + self.ttl, size, rows)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self._evictions += 1
+
+    def _discard(self, key: Tuple[str, tuple]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    @staticmethod
+    def _estimate_size(rows: List[Dict[str, Any]]) -> int:
+        """Approximate memory use by the rows' serialized length."""
+
+        return len(json.dumps(rows, default=str))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report hit ratio, staleness and memory use."""
+
+        lookups = self._hits + self._misses
+        return {
+            "write_version": self.write_version,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "stale": self._stale,
+            "evictions": self._evictions,
+            "too_large": self._too_large,
+            "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0
+        }
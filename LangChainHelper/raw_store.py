@@ -0,0 +1,71 @@
+import zlib
+from typing import Any, Dict, Optional
+
+try:
+    import zstandard
+except ImportError:  # Optional; zlib is always available
+    zstandard = None
+
+class RawResponseCodec:
+    """
+    Compression for raw LLM responses kept in the raw_responses table.
+
+    Each stored payload records the codec that wrote it, so the codec can
+    change without rewriting old rows. zstd needs the optional
+    `zstandard` package; without it the codec falls back to zlib.
+    """
+
+    def __init__(self, codec: str = "zlib", level: Optional[int] = None):
+        """
+        Args:
+            codec: "zlib" or "zstd"
+            level: Compression level (None for the codec's default)
+        """
+        codec = codec.lower()
+        if codec not in ("zlib", "zstd"):
+            raise ValueError(f"Unknown raw response codec: {codec}")
+        if codec == "zstd" and zstandard is None:
+            print("⚠️ zstandard is not installed; compressing raw responses with zlib")
+            codec = "zlib"
+
+        self.codec = codec
+        self.level = level
+
+        self._compressed = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+
+    def encode(self, text: str) -> bytes:
+        """Compress a JSON document with the configured codec."""
+
+        data = text.encode("utf-8")
+        if self.codec == "zstd":
+            payload = zstandard.ZstdCompressor(level=self.level or 3).compress(data)
+        else:
+            payload = zlib.compress(data, self.level if self.level is not None else 6)
+
+        self._compressed += 1
+        self._bytes_in += len(data)
+        self._bytes_out += len(payload)
+        return payload
+
+    @staticmethod
+    def decode(payload: bytes, codec: str) -> str:
+        """Decompress a payload written with the given codec."""
+
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read this raw response")
+            return zstandard.ZstdDecompressor().decompress(bytes(payload)).decode("utf-8")
+        return zlib.decompress(bytes(payload)).decode("utf-8")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report compressed volume and ratio since startup."""
+
+        return {
+            "codec": self.codec,
+            "compressed": self._compressed,
+            "bytes_in": self._bytes_in,
+            "bytes_out": self._bytes_out,
+            "ratio": round(self._bytes_out / self._bytes_in, 3) if self._bytes_in else 0.0
+        }
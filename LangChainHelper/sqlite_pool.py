@@ -0,0 +1,107 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List
+
+import aiosqlite
+
+class SQLitePool:
+    """
+    Small pool of long-lived aiosqlite connections.
+
+    SQLite has no server to pool against, but opening a connection still
+    costs a file open, schema load and a dedicated thread inside aiosqlite.
+    The pool keeps a fixed set of connections open in WAL mode so readers
+    never block the single writer and each request reuses a warm connection.
+    """
+
+    def __init__(self, path: str, size: int = 4, acquire_timeout: float = 10.0, busy_timeout: float = 5.0):
+        """
+        Initialize pool settings. Connections are opened in open().
+
+        Args:
+            path: SQLite database file path
+            size: Number of connections kept open
+            acquire_timeout: Seconds to wait for a free connection
+            busy_timeout: Seconds SQLite waits on a locked database
+        """
+        self.path = path
+        self.size = max(1, size)
+        self.acquire_timeout = acquire_timeout
+        self.busy_timeout = busy_timeout
+
+        self._connections: List[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue = None
+        self._waiting = 0
+        self._acquisitions = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def open(self):
+        """Open all connections and switch the database to WAL mode."""
+
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            conn = await aiosqlite.connect(self.path)
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def close(self):
+        """Close every pooled connection."""
+
+        for conn in self._connections:
+            await conn.close()
+        self._connections = []
+        self._idle = None
+
+    @asynccontextmanager
+    async def acquire(self):
+        """Borrow a connection, waiting up to acquire_timeout for one to free up."""
+
+        if self._idle is None:
+            raise RuntimeError("SQLite pool is not open")
+
+        started = time.perf_counter()
+        self._waiting += 1
+        try:
+            conn = await asyncio.wait_for(self._idle.get(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            raise RuntimeError(f"Timed out waiting {self.acquire_timeout}s for a SQLite connection")
+        finally:
+            self._waiting -= 1
+
+        waited = time.perf_counter() - started
+        self._acquisitions += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+
+        try:
+            yield conn
+        finally:
+            # Never hand the next borrower a half-finished transaction
+            if conn.in_transaction:
+                await conn.rollback()
+            self._idle.put_nowait(conn)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report pool size, usage and wait times."""
+
+        idle = self._idle.qsize() if self._idle is not None else 0
+        in_use = len(self._connections) - idle
+        return {
+            "size": len(self._connections),
+            "max_size": self.size,
+            "in_use": in_use,
+            "idle": idle,
+            "waiting": self._waiting,
+            "saturation": round(in_use / self.size, 3),
+            "acquisitions": self._acquisitions,
+            "acquire_timeouts": self._timeouts,
+            "avg_wait_ms": round(self._total_wait / self._acquisitions * 1000, 3) if self._acquisitions else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 3)
+        }
@@ -0,0 +1,107 @@
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+class StatisticsStore:
+    """
+    Incrementally maintained aggregates over pollution_records.
+
+    Keeps running totals per pollution type and severity, the number of
+    records with coordinates, and hourly buckets covering a sliding
+    window. Counters are rebuilt from the table once at startup and then
+    updated as records are written, so reading them costs the same no
+    matter how large the table grows. Records written by other processes
+    are only picked up by the next rebuild.
+    """
+
+    def __init__(self, window_days: int = 7):
+        """
+        Args:
+            window_days: Length of the recent-activity window
+        """
+        self.window = timedelta(days=window_days)
+        self.window_days = window_days
+        self._reset()
+
+    def _reset(self):
+        self.total = 0
+        self.located = 0
+        self.by_type: Counter = Counter()
+        self.by_severity: Counter = Counter()
+        # Hour (as datetime truncated to the hour) -> records created in it
+        self._hours: Dict[datetime, int] = {}
+        self._recent = 0
+        self._expired_before: Optional[datetime] = None
+        self.rebuilt_at: Optional[float] = None
+
+    @staticmethod
+    def _hour(created_at: datetime) -> datetime:
+        return created_at.replace(minute=0, second=0, microsecond=0)
+
+    def record(self, pollution_type: Optional[str], severity_level: Optional[str], located: bool,
+               created_at: datetime, count: int = 1):
+        """Count newly written records."""
+
+        self.total += count
+        if located:
+            self.located += count
+        if pollution_type:
+            self.by_type[pollution_type] += count
+        if severity_level:
+            self.by_severity[severity_level] += count
+
+        if created_at > datetime.now() - self.window:
+            hour = self._hour(created_at)
+            self._hours[hour] = self._hours.get(hour, 0) + count
+            self._recent += count
+
+    def rebuild(self, groups: Iterable[Tuple[Optional[str], Optional[str], bool, int]],
+                recent_hours: Iterable[Tuple[datetime, int]]):
+        """
+        Replace all counters with aggregates read from the table.
+
+        Args:
+            groups: (pollution_type, severity_level, located, count) rows
+            recent_hours: (hour, count) rows for the window
+        """
+
+        self._reset()
+        for pollution_type, severity_level, located, count in groups:
+            self.total += count
+            if located:
+                self.located += count
+            if pollution_type:
+                self.by_type[pollution_type] += count
+            if severity_level:
+                self.by_severity[severity_level] += count
+
+        for hour, count in recent_hours:
+            hour = self._hour(hour)
+            self._hours[hour] = self._hours.get(hour, 0) + count
+            self._recent += count
+        self.rebuilt_at = time.time()
+
+    def recent_count(self) -> int:
+        """Records created within the window, at hourly granularity."""
+
+        # Buckets only need expiring once per hour; at most window_days * 24 + 1 exist
+        cutoff = self._hour(datetime.now() - self.window)
+        if cutoff != self._expired_before:
+            for hour in [hour for hour in self._hours if hour < cutoff]:
+                self._recent -= self._hours.pop(hour)
+            self._expired_before = cutoff
+        return self._recent
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current aggregates in the shape of LangChainHelper.get_statistics()."""
+
+        return {
+            "total_records": self.total,
+            "pollution_types": [{"type": name, "count": count} for name, count in self.by_type.most_common()],
+            "severity_levels": dict(self.by_severity.most_common()),
+            "records_with_location": self.located,
+            "recent_activity": self.recent_count(),
+            "window_days": self.window_days,
+            "rebuilt_at": datetime.fromtimestamp(self.rebuilt_at).isoformat() if self.rebuilt_at else None
+        }
@@ -0,0 +1,174 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Marks the end of the queue when the buffer is closing
+_STOP = object()
+
+class WriteBufferError(RuntimeError):
+    """A batch could not be written after all retries."""
+
+class WriteBehindBuffer:
+    """
+    Async write-behind queue that groups inserts into batches.
+
+    Producers enqueue records and get a future for the record ID without
+    waiting for the database. A single background task collects records
+    until either batch_size is reached or flush_interval has passed since
+    the first record of the batch, then writes the batch in one round trip.
+    The queue is bounded, so producers wait when the database falls behind.
+    """
+
+    def __init__(
+        self,
+        flush_func: Callable[[List[Any]], Awaitable[List[int]]],
+        batch_size: int = 100,
+        flush_interval: float = 0.25,
+        max_pending: int = 1000,
+        max_retries: int = 2
+    ):
+        """
+        Initialize buffer settings. The flush task is started in start().
+
+        Args:
+            flush_func: Coroutine that writes a list of records and returns their IDs
+            batch_size: Maximum records per flush
+            flush_interval: Seconds to wait for a batch to fill before flushing
+            max_pending: Queue capacity before producers are made to wait
+            max_retries: Extra attempts for a batch that fails to write
+        """
+        self.flush_func = flush_func
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self.max_retries = max_retries
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self._enqueued = 0
+        self._written = 0
+        self._failed = 0
+        self._batches = 0
+        self._backpressure_waits = 0
+        self._last_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        """Start the background flush task on the running event loop."""
+
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+
+    async def put(self, record: Any) -> asyncio.Future:
+        """
+        Enqueue a record for writing.
+
+        Waits only when the queue is full (backpressure).
+
+        Returns:
+            Future resolved with the record ID once its batch is written
+        """
+
+        if not self.running or self._closing:
+            raise RuntimeError("Write buffer is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        # Callers are free to ignore the future; failures are logged by the flush task
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+        if self._queue.full():
+            self._backpressure_waits += 1
+        await self._queue.put((record, future))
+        self._enqueued += 1
+        return future
+
+    async def close(self):
+        """Stop accepting records and wait until everything queued is written."""
+
+        if not self.running:
+            return
+        self._closing = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        """Collect records into batches and flush them until stopped."""
+
+        loop = asyncio.get_running_loop()
+        stop = False
+        while not stop:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[tuple]):
+        """Write one batch, retrying transient failures, and resolve its futures."""
+
+        records = [record for record, _ in batch]
+        futures = [future for _, future in batch]
+
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                record_ids = await self.flush_func(records)
+                self._last_flush_ms = (time.perf_counter() - started) * 1000
+                self._batches += 1
+                self._written += len(records)
+                for future, record_id in zip(futures, record_ids):
+                    if not future.done():
+                        future.set_result(record_id)
+                return
+            except Exception as e:
+                last_error = e
+                print(f"❌ Batch write of {len(records)} records failed (attempt {attempt + 1}): {str(e)}")
+                await asyncio.sleep(0.5 * (attempt + 1))
+
+        self._failed += len(records)
+        for future in futures:
+            if not future.done():
+                future.set_exception(WriteBufferError(f"Failed to write record batch: {str(last_error)}"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Report queue depth and write throughput counters."""
+
+        return {
+            "running": self.running,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "max_pending": self.max_pending,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "failed": self._failed,
+            "batches": self._batches,
+            "avg_batch_size": round(self._written / self._batches, 2) if self._batches else 0.0,
+            "backpressure_waits": self._backpressure_waits,
+            "last_flush_ms": round(self._last_flush_ms, 3)
+        }
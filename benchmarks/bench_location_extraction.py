@@ -0,0 +1,51 @@
+"""
+Micro-benchmark for location candidate extraction.
+
+Measures per-transcript extraction cost for CandidateExtractor on
+transcripts of increasing length.
+
+Usage:
+    python benchmarks/bench_location_extraction.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from location.candidates import CandidateExtractor
+
+SAMPLE_REPORT = (
+    "Hi, I'm calling to report a serious environmental issue. There's been industrial "
+    "discharge into the Rhine River near the German residential area in Lahore, Pakistan. "
+    "Local residents near Central Park at 123 Main Street, Springfield, IL are experiencing "
+    "respiratory problems. The water has changed color next to the old bridge on Highway 101 "
+    "and there's a strong chemical smell by the station downtown. "
+)
+
+def bench(extractor: CandidateExtractor, text: str, min_seconds: float = 0.5) -> float:
+    """Return mean seconds per extraction, running for at least min_seconds."""
+    
+    iterations = 0
+    started = time.perf_counter()
+    while True:
+        extractor.extract(text)
+        iterations += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return elapsed / iterations
+
+def main():
+    started = time.perf_counter()
+    extractor = CandidateExtractor()
+    print(f"Pattern compilation + automaton build: {(time.perf_counter() - started) * 1000:.2f} ms")
+    print(f"{'chars':>8} {'per transcript':>16} {'per 1k chars':>14}")
+    
+    for repeats in (1, 10, 50, 200):
+        text = SAMPLE_REPORT * repeats
+        per_call = bench(extractor, text)
+        print(f"{len(text):>8} {per_call * 1000:>13.3f} ms {per_call * 1000 / (len(text) / 1000):>11.3f} ms")
+
+if __name__ == "__main__":
+    main()
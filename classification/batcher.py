@@ -0,0 +1,114 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into batched calls.
+    
+    Items submitted within max_wait of the first pending item are handed
+    to the handler together, up to max_batch_size per call; a full batch
+    is dispatched at once. The handler returns one result per item, in
+    order, and an Exception in a slot fails only that item's caller.
+    """
+    
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        max_wait: float = 0.02
+    ):
+        """
+        Args:
+            handler: Coroutine processing a list of items into a list of results
+            max_batch_size: Most items passed to one handler call
+            max_wait: Seconds the first item of a batch waits for company
+        """
+        self.handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        
+        self._batches = 0
+        self._items = 0
+        self._full_batches = 0
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue an item and wait for its result.
+        
+        Raises:
+            Exception: Whatever the handler raised for this item or its batch
+        """
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+    
+    def _flush(self):
+        """Dispatch pending items in batches of at most max_batch_size."""
+        
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        # Callers that gave up before dispatch are not sent at all
+        pending = [(item, future) for item, future in self._pending if not future.done()]
+        self._pending = []
+        
+        for start in range(0, len(pending), self.max_batch_size):
+            batch = pending[start:start + self.max_batch_size]
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self._batches += 1
+        self._items += len(batch)
+        if len(batch) == self.max_batch_size:
+            self._full_batches += 1
+        
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+    
+    async def close(self):
+        """Dispatch anything still pending and wait for in-flight batches."""
+        
+        if self._pending:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Report batch counts and average batch size."""
+        
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "pending": len(self._pending),
+            "batches": self._batches,
+            "items": self._items,
+            "full_batches": self._full_batches,
+            "avg_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0
+        }
@@ -0,0 +1,169 @@
+import asyncio
+import copy
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import aiosqlite
+
+class ClassificationCache:
+    """
+    Content-addressed cache for LLM classification results.
+    
+    Keys are a hash of the prompt version plus the normalized transcription,
+    so repeat reports of the same incident reuse one Cohere call and a
+    prompt change invalidates everything automatically. Entries live in an
+    in-memory LRU with a TTL, optionally backed by a SQLite table that
+    survives restarts.
+    """
+    
+    def __init__(self, prompt_version: str, max_entries: int = 1024, ttl: float = 86400, db_path: Optional[str] = None):
+        """
+        Initialize cache settings.
+        
+        Args:
+            prompt_version: Version of the prompt the cached results came from
+            max_entries: Maximum entries held in memory
+            ttl: Seconds an entry stays valid
+            db_path: SQLite file for the persistent tier (None to disable)
+        """
+        self.prompt_version = prompt_version
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.db_path = db_path
+        
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db: Optional[aiosqlite.Connection] = None
+        self._db_lock = asyncio.Lock()
+        
+        self._memory_hits = 0
+        self._persistent_hits = 0
+        self._misses = 0
+        self._evictions = 0
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize a transcription so trivially different reports share a key."""
+        
+        text = re.sub(r'[^\w\s]', ' ', text.lower())
+        return re.sub(r'\s+', ' ', text).strip()
+    
+    def make_key(self, text: str) -> str:
+        """Hash the prompt version and normalized text into a cache key."""
+        
+        payload = f"{self.prompt_version}\n{self.normalize(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    async def get(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached classification.
+        
+        Args:
+            text: Transcribed report text
+            
+        Returns:
+            Copy of the cached result, or None on a miss
+        """
+        
+        key = self.make_key(text)
+        now = time.time()
+        
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self._memory_hits += 1
+                return copy.deepcopy(value)
+            del self._entries[key]
+        
+        if self.db_path:
+            db = await self._get_db()
+            cursor = await db.execute(
+                "SELECT value, expires_at FROM classification_cache WHERE key = ?", (key,)
+            )
+            row = await cursor.fetchone()
+            if row is not None and row[1] > now:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self._persistent_hits += 1
+                return copy.deepcopy(value)
+        
+        self._misses += 1
+        return None
+    
+    async def set(self, text: str, value: Dict[str, Any]):
+        """
+        Store a classification result.
+        
+        Args:
+            text: Transcribed report text
+            value: Parsed classification result
+        """
+        
+        key = self.make_key(text)
+        expires_at = time.time() + self.ttl
+        self._remember(key, copy.deepcopy(value), expires_at)
+        
+        if self.db_path:
+            db = await self._get_db()
+            await db.execute(
+                "INSERT OR REPLACE INTO classification_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            await db.commit()
+    
+    def _remember(self, key: str, value: Dict[str, Any], expires_at: float):
+        """Insert into the in-memory LRU, evicting the oldest entries past capacity."""
+        
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+    
+    async def _get_db(self) -> aiosqlite.Connection:
+        """Open the persistent tier on first use."""
+        
+        async with self._db_lock:
+            if self._db is None:
+                db = await aiosqlite.connect(self.db_path)
+                await db.execute("PRAGMA journal_mode=WAL")
+                await db.execute("""
+                    CREATE TABLE IF NOT EXISTS classification_cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+                await db.execute("DELETE FROM classification_cache WHERE expires_at <= ?", (time.time(),))
+                await db.commit()
+                self._db = db
+        return self._db
+    
+    async def close(self):
+        """Close the persistent tier."""
+        
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Report hit/miss counters and memory usage."""
+        
+        lookups = self._memory_hits + self._persistent_hits + self._misses
+        hits = self._memory_hits + self._persistent_hits
+        return {
+            "prompt_version": self.prompt_version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_hits": self._memory_hits,
+            "persistent_hits": self._persistent_hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "persistent": bool(self.db_path)
+        }
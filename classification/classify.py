@@ -1,7 +1,17 @@
 import cohere
 import os
 import json
-from typing import Dict, Any
+import asyncio
+import copy
+import time
+from typing import Dict, Any, List, Optional
+
+from .batcher import MicroBatcher
+from .cache import ClassificationCache
+from .fast_path import FastPathClassifier
+
+# Bump whenever _build_analysis_prompt changes so cached results are not reused
+PROMPT_VERSION = "1"
 
 class PollutionAnalyzerLLM:
     """
@@ -17,7 +27,43 @@ class PollutionAnalyzerLLM:
         if not self.api_key:
             raise ValueError("COHERE_API_KEY environment variable is required")
         
-        self.client = cohere.Client(self.api_key)
+        # Concurrency limit for in-flight Cohere requests
+        self.max_concurrency = int(os.getenv("COHERE_MAX_CONCURRENCY", "32"))
+        self.request_timeout = float(os.getenv("COHERE_REQUEST_TIMEOUT", "60"))
+        
+        # Async client so in-flight generations never block the event loop
+        self.client = cohere.AsyncClient(
+            self.api_key,
+            num_workers=self.max_concurrency,
+            timeout=self.request_timeout
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        # Queue depth and latency counters
+        self._waiting = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._errors = 0
+        self._total_latency = 0.0
+        
+        # Result cache keyed on normalized transcription + prompt version
+        self.cache_enabled = os.getenv("CLASSIFICATION_CACHE_ENABLED", "true").lower() == "true"
+        self.cache = ClassificationCache(
+            PROMPT_VERSION,
+            max_entries=int(os.getenv("CLASSIFICATION_CACHE_SIZE", "1024")),
+            ttl=float(os.getenv("CLASSIFICATION_CACHE_TTL", "86400")),
+            db_path=os.getenv("CLASSIFICATION_CACHE_DB") or None
+        )
+        
+        # Reports arriving together share one Cohere call (batch size 1 disables)
+        batch_size = int(os.getenv("CLASSIFICATION_BATCH_SIZE", "8"))
+        self.batcher = MicroBatcher(
+            self._classify_batch,
+            max_batch_size=batch_size,
+            max_wait=float(os.getenv("CLASSIFICATION_BATCH_MAX_WAIT", "0.02"))
+        ) if batch_size > 1 else None
+        # Longer reports would crowd the shared prompt and answer budget; they get their own call
+        self.batch_max_chars = int(os.getenv("CLASSIFICATION_BATCH_MAX_CHARS", "2000"))
         
         # Pollution type categories
         self.pollution_types = [
@@ -41,50 +87,379 @@ class PollutionAnalyzerLLM:
             "plastic pollution": "EPA Waste Management Division",
             "radioactive contamination": "Nuclear Regulatory Commission (NRC)"
         }
+        
+        # Local classifier answering confident cases without a Cohere call
+        self.fast_path_enabled = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+        self.fast_path_threshold = float(os.getenv("FAST_PATH_THRESHOLD", "0.9"))
+        self.fast_path_severity_threshold = float(os.getenv("FAST_PATH_SEVERITY_THRESHOLD", "0.6"))
+        # "template" fills the recommendation locally, "llm" asks Cohere for the text only
+        self.fast_path_recommendation = os.getenv("FAST_PATH_RECOMMENDATION", "template").lower()
+        self.fast_path = FastPathClassifier(
+            self.pollution_types,
+            min_matches=int(os.getenv("FAST_PATH_MIN_MATCHES", "2"))
+        )
+        self._fast_path_hits = 0
+        self._fast_path_misses = 0
+        self._fast_path_abstained = 0
+        self._fast_path_time = 0.0
+    
+    def train_fast_path(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Retrain the local classifier from stored analysis records.
+        
+        Only results that came from Cohere are used; API-failure fallbacks
+        and earlier fast-path answers would teach the model its own guesses.
+        
+        Args:
+            records: Dictionaries with transcription, pollution_type,
+                severity_level and raw_response (JSON text)
+                
+        Returns:
+            Number of records the classifier was trained on
+        """
+        
+        samples = []
+        for record in records:
+            try:
+                raw = json.loads(record.get("raw_response") or "{}")
+            except (TypeError, ValueError):
+                raw = {}
+            if not isinstance(raw, dict) or raw.get("fallback") or raw.get("fast_path") or raw.get("parse_fallback"):
+                continue
+            samples.append((record.get("transcription"), record.get("pollution_type"), record.get("severity_level")))
+        
+        return self.fast_path.train(samples)
     
-    async def analyze(self, text: str) -> Dict[str, Any]:
+    async def analyze(self, text: str, bypass_cache: bool = False) -> Dict[str, Any]:
         """
         Analyze pollution description and generate comprehensive response.
         
+        Reports the local classifier is confident about skip the full
+        Cohere analysis; everything else goes to the LLM.
+        
         Args:
             text: Transcribed text describing pollution incident
+            bypass_cache: Skip the result cache and always call Cohere
             
         Returns:
             Dictionary containing pollution type, recommendation, responsible agency, and raw response
         """
         
-        # Construct analysis prompt
-        prompt = self._build_analysis_prompt(text)
+        use_cache = self.cache_enabled and not bypass_cache
+        if use_cache:
+            cached = await self._cache_get(text)
+            if cached is not None:
+                cached["raw_response"] = {**cached.get("raw_response", {}), "cached": True}
+                return cached
         
-        try:
-            # Generate response using Cohere with correct parameters
-            response = self.client.generate(
-                prompt=prompt,
-                max_tokens=800,
-                temperature=0.3,
-                k=0,
-                stop_sequences=[],
-                return_likelihoods='NONE'
-            )
-            
-            # Parse the structured response
-            parsed_response = self._parse_response(response.generations[0].text)
-            
-            # Add raw response for debugging/audit purposes
-            parsed_response["raw_response"] = {
-                "text": response.generations[0].text,
-                "meta": {
-                    "api_version": getattr(response, 'api_version', None),
-                    "model": "command"
-                }
-            }
+        if self.fast_path_enabled:
+            started = time.perf_counter()
+            prediction = self.fast_path.classify(text)
+            self._fast_path_time += time.perf_counter() - started
             
-            return parsed_response
+            if prediction is None:
+                self._fast_path_abstained += 1
+            elif (prediction["confidence"] < self.fast_path_threshold
+                  or prediction["severity_confidence"] < self.fast_path_severity_threshold):
+                self._fast_path_misses += 1
+            else:
+                self._fast_path_hits += 1
+                return await self._fast_path_response(text, prediction)
+        
+        try:
+            if self.batcher is not None:
+                parsed_response = await self.batcher.submit(text)
+            else:
+                parsed_response = await self._classify_single(text)
             
         except Exception as e:
             print(f"Cohere API error: {str(e)}")
             # Fallback response in case of API failure
             return self._generate_fallback_response(text, str(e))
+        
+        # Only structured LLM answers are cached, never API or parse fallbacks
+        if use_cache and not parsed_response["raw_response"].get("parse_fallback"):
+            await self._cache_set(text, parsed_response)
+        
+        return parsed_response
+    
+    async def _cache_get(self, text: str) -> Optional[Dict[str, Any]]:
+        """Read from the result cache, treating cache errors as misses."""
+        
+        try:
+            return await self.cache.get(text)
+        except Exception as e:
+            print(f"⚠️ Classification cache read failed: {str(e)}")
+            return None
+    
+    async def _cache_set(self, text: str, result: Dict[str, Any]):
+        """Write to the result cache, ignoring cache errors."""
+        
+        try:
+            await self.cache.set(text, result)
+        except Exception as e:
+            print(f"⚠️ Classification cache write failed: {str(e)}")
+    
+    async def _classify_single(self, text: str) -> Dict[str, Any]:
+        """Classify one report with its own Cohere call."""
+        
+        # Construct analysis prompt
+        prompt = self._build_analysis_prompt(text)
+        
+        # Generate response using Cohere with correct parameters
+        response = await self._generate(
+            prompt=prompt,
+            max_tokens=800,
+            temperature=0.3,
+            k=0,
+            stop_sequences=[],
+            return_likelihoods='NONE'
+        )
+        
+        # Parse the structured response
+        parsed_response = self._parse_response(response.generations[0].text)
+        parse_fallback = parsed_response.pop("parse_fallback", False)
+        
+        # Add raw response for debugging/audit purposes
+        parsed_response["raw_response"] = {
+            "text": response.generations[0].text,
+            "meta": {
+                "api_version": getattr(response, 'api_version', None),
+                "model": "command",
+                "prompt_version": PROMPT_VERSION
+            }
+        }
+        if parse_fallback:
+            parsed_response["raw_response"]["parse_fallback"] = True
+        return parsed_response
+    
+    async def _classify_batch(self, texts: List[str]) -> List[Any]:
+        """
+        Classify several reports with one Cohere call.
+        
+        The reports are numbered in a single prompt and the model answers
+        with a JSON array of analyses carrying the same numbers. Reports
+        longer than batch_max_chars, reports missing from the answer and,
+        when the batched call itself fails, every report are classified
+        with their own call, so one failure never fails the whole batch.
+        
+        Returns:
+            One analysis (or Exception) per text, in order
+        """
+        
+        # Identical reports in one batch share a slot
+        unique = list(dict.fromkeys(texts))
+        batched = [text for text in unique if len(text) <= self.batch_max_chars]
+        
+        results: Dict[str, Any] = {}
+        if len(batched) > 1:
+            try:
+                results = await self._classify_batched(batched)
+            except Exception as e:
+                print(f"⚠️ Batch classification of {len(batched)} reports failed, classifying them one by one: {str(e)}")
+            else:
+                if len(results) < len(batched):
+                    print(f"⚠️ Batch answer covered {len(results)} of {len(batched)} reports; retrying the rest")
+        
+        missing = [text for text in unique if text not in results]
+        if missing:
+            retried = await asyncio.gather(*(self._classify_single(text) for text in missing), return_exceptions=True)
+            results.update(zip(missing, retried))
+        
+        return [
+            results[text] if isinstance(results[text], Exception) else copy.deepcopy(results[text])
+            for text in texts
+        ]
+    
+    async def _classify_batched(self, unique: List[str]) -> Dict[str, Any]:
+        """
+        Send distinct reports in one Cohere call.
+        
+        Returns:
+            Analyses by report text, for the reports the answer covered
+        """
+        
+        response = await self._generate(
+            prompt=self._build_batch_prompt(unique),
+            max_tokens=min(4000, 400 * len(unique)),
+            temperature=0.3,
+            k=0,
+            stop_sequences=[],
+            return_likelihoods='NONE'
+        )
+        generated = response.generations[0].text
+        
+        by_index = {}
+        json_start = generated.find('[')
+        json_end = generated.rfind(']') + 1
+        if json_start != -1 and json_end > json_start:
+            try:
+                items = json.loads(generated[json_start:json_end])
+            except json.JSONDecodeError as e:
+                print(f"Batch JSON parsing error: {str(e)}")
+                items = []
+            for position, item in enumerate(items):
+                if not isinstance(item, dict):
+                    continue
+                index = item.get("index", position + 1)
+                if isinstance(index, int) and 1 <= index <= len(unique):
+                    by_index.setdefault(index - 1, item)
+        
+        results: Dict[str, Any] = {}
+        for index, item in by_index.items():
+            result = self._build_result(item)
+            result["raw_response"] = {
+                "text": json.dumps(item),
+                "meta": {
+                    "api_version": getattr(response, 'api_version', None),
+                    "model": "command",
+                    "prompt_version": PROMPT_VERSION,
+                    "batch_size": len(unique),
+                    "batch_index": index + 1
+                }
+            }
+            results[unique[index]] = result
+        return results
+    
+    async def _fast_path_response(self, text: str, prediction: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a full analysis around a confident local classification."""
+        
+        pollution_type = prediction["pollution_type"]
+        severity_level = prediction["severity_level"]
+        result = {
+            "pollution_type": pollution_type,
+            "responsible_agency": self._get_responsible_agency(pollution_type),
+            "severity_level": severity_level,
+            **self._template_recommendation(pollution_type, severity_level)
+        }
+        raw_response = {"fast_path": True, "prediction": prediction}
+        
+        if self.fast_path_recommendation == "llm":
+            try:
+                response = await self._generate(
+                    prompt=self._build_recommendation_prompt(text, pollution_type, severity_level),
+                    max_tokens=300,
+                    temperature=0.3,
+                    k=0,
+                    stop_sequences=[],
+                    return_likelihoods='NONE'
+                )
+                generated = response.generations[0].text
+                json_start = generated.find('{')
+                json_end = generated.rfind('}') + 1
+                parsed = json.loads(generated[json_start:json_end]) if json_start != -1 and json_end > json_start else {}
+                for field in ("recommendation", "immediate_actions", "long_term_solution"):
+                    if isinstance(parsed.get(field), str) and parsed[field].strip():
+                        result[field] = parsed[field]
+                raw_response["text"] = generated
+            except Exception as e:
+                # The classification stands; keep the template text
+                print(f"Cohere recommendation error: {str(e)}")
+                raw_response["error"] = str(e)
+        
+        result["raw_response"] = raw_response
+        return result
+    
+    def _template_recommendation(self, pollution_type: str, severity_level: str) -> Dict[str, str]:
+        """Canned recommendation text for a pollution type and severity."""
+        
+        urgent = severity_level in ("high", "critical")
+        immediate_actions = (
+            "Keep people away from the affected area and alert emergency services and the responsible agency immediately."
+            if urgent else
+            "Document the site with photos and report it to the responsible agency for inspection."
+        )
+        return {
+            "recommendation": f"Report this {pollution_type} incident to the {self._get_responsible_agency(pollution_type)} so the source can be identified and contained. Trained responders should carry out cleanup and test the surrounding area for further contamination.",
+            "immediate_actions": immediate_actions,
+            "long_term_solution": "Monitor the site regularly, enforce compliance at the source and restore the affected area."
+        }
+    
+    def _build_recommendation_prompt(self, text: str, pollution_type: str, severity_level: str) -> str:
+        """Build a prompt asking only for recommendation text for a known classification."""
+        
+        return f"""
+You are an expert environmental analyst. The following pollution report has been classified as {pollution_type} with {severity_level} severity.
+
+POLLUTION REPORT:
+{text}
+
+Respond in the following JSON format:
+
+{{
+    "recommendation": "detailed cleanup and mitigation steps (2-3 sentences)",
+    "immediate_actions": "urgent steps to take (1-2 sentences)",
+    "long_term_solution": "preventive measures and long-term remediation"
+}}
+
+Response:
+"""
+    
+    async def _generate(self, **kwargs):
+        """Call Cohere generate, waiting for a free slot when at the concurrency limit."""
+        
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await self.client.generate(**kwargs)
+            self._completed += 1
+            return response
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            self._total_latency += time.perf_counter() - started
+            self._in_flight -= 1
+            self._semaphore.release()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Report LLM queue depth, concurrency and latency."""
+        
+        calls = self._completed + self._errors
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "completed": self._completed,
+            "errors": self._errors,
+            "avg_latency_ms": round(self._total_latency / calls * 1000, 2) if calls else 0.0,
+            "cache": self.cache.get_stats() if self.cache_enabled else {"enabled": False},
+            "fast_path": self._fast_path_stats(),
+            "batching": self.batcher.get_stats() if self.batcher is not None else {"enabled": False}
+        }
+    
+    def _fast_path_stats(self) -> Dict[str, Any]:
+        """Report how often the local classifier answered instead of Cohere."""
+        
+        if not self.fast_path_enabled:
+            return {"enabled": False}
+        
+        lookups = self._fast_path_hits + self._fast_path_misses + self._fast_path_abstained
+        return {
+            "enabled": True,
+            "threshold": self.fast_path_threshold,
+            "severity_threshold": self.fast_path_severity_threshold,
+            "recommendation": self.fast_path_recommendation,
+            "trained_records": self.fast_path.trained_records,
+            "hits": self._fast_path_hits,
+            "misses": self._fast_path_misses,
+            "abstained": self._fast_path_abstained,
+            "hit_rate": round(self._fast_path_hits / lookups, 3) if lookups else 0.0,
+            "avg_classify_us": round(self._fast_path_time / lookups * 1e6, 1) if lookups else 0.0
+        }
+    
+    async def close(self):
+        """Finish pending batches, then close the HTTP session and the result cache."""
+        if self.batcher is not None:
+            await self.batcher.close()
+        await self.client.close()
+        await self.cache.close()
     
     def _build_analysis_prompt(self, text: str) -> str:
         """Build structured prompt for pollution analysis."""
@@ -112,11 +487,48 @@ Focus on:
 3. Correct agency identification
 4. Public safety considerations
 
+Response:
+"""
+    
+    def _build_batch_prompt(self, texts: List[str]) -> str:
+        """Build one prompt analyzing several numbered reports."""
+        
+        reports = "\n\n".join(f"REPORT {index}:\n{text}" for index, text in enumerate(texts, 1))
+        return f"""
+You are an expert environmental analyst. Analyze each of the following {len(texts)} pollution reports independently and provide a structured response for every one.
+
+{reports}
+
+Respond with a JSON array containing exactly one object per report, in this format:
+
+[
+    {{
+        "index": report number,
+        "pollution_type": "specific pollution category from: {', '.join(self.pollution_types)}",
+        "recommendation": "detailed cleanup and mitigation steps (2-3 sentences)",
+        "responsible_agency": "appropriate government agency or department",
+        "severity_level": "low/medium/high/critical",
+        "immediate_actions": "urgent steps to take (1-2 sentences)",
+        "long_term_solution": "preventive measures and long-term remediation"
+    }}
+]
+
+Focus on:
+1. Accurate pollution type classification
+2. Practical, actionable recommendations
+3. Correct agency identification
+4. Public safety considerations
+
 Response:
 """
     
     def _parse_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse and validate Cohere response."""
+        """
+        Parse and validate Cohere response.
+        
+        Results not taken from the model's JSON are marked with
+        parse_fallback so they are never cached.
+        """
         
         try:
             # Try to extract JSON from response
@@ -127,29 +539,34 @@ Response:
                 json_str = response_text[json_start:json_end]
                 parsed = json.loads(json_str)
                 
-                # Validate required fields
-                pollution_type = parsed.get("pollution_type", "unknown pollution")
-                recommendation = parsed.get("recommendation", "Contact local environmental authorities for assessment.")
-                
-                # Determine responsible agency
-                responsible_agency = self._get_responsible_agency(pollution_type)
-                
-                return {
-                    "pollution_type": pollution_type,
-                    "recommendation": recommendation,
-                    "responsible_agency": responsible_agency,
-                    "severity_level": parsed.get("severity_level", "medium"),
-                    "immediate_actions": parsed.get("immediate_actions", "Secure the area and report to authorities."),
-                    "long_term_solution": parsed.get("long_term_solution", "Regular monitoring and compliance checks.")
-                }
+                return self._build_result(parsed)
             
         except (json.JSONDecodeError, KeyError) as e:
             print(f"JSON parsing error: {str(e)}")
             # Fallback parsing if JSON extraction fails
-            return self._extract_from_text(response_text)
+            return {**self._extract_from_text(response_text), "parse_fallback": True}
         
         # Last resort fallback
-        return self._generate_default_response()
+        return {**self._generate_default_response(), "parse_fallback": True}
+    
+    def _build_result(self, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill defaults into one parsed analysis and attach the responsible agency."""
+        
+        # Validate required fields
+        pollution_type = parsed.get("pollution_type", "unknown pollution")
+        recommendation = parsed.get("recommendation", "Contact local environmental authorities for assessment.")
+        
+        # Determine responsible agency
+        responsible_agency = self._get_responsible_agency(pollution_type)
+        
+        return {
+            "pollution_type": pollution_type,
+            "recommendation": recommendation,
+            "responsible_agency": responsible_agency,
+            "severity_level": parsed.get("severity_level", "medium"),
+            "immediate_actions": parsed.get("immediate_actions", "Secure the area and report to authorities."),
+            "long_term_solution": parsed.get("long_term_solution", "Regular monitoring and compliance checks.")
+        }
     
     def _get_responsible_agency(self, pollution_type: str) -> str:
         """Determine responsible agency based on pollution type."""
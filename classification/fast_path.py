@@ -0,0 +1,181 @@
+import math
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Keywords each label starts out with before any stored records are seen
+SEED_TYPE_KEYWORDS = {
+    "air pollution": ["air", "smoke", "smog", "haze", "fumes", "burning", "breathe", "dust"],
+    "water pollution": ["water", "river", "lake", "stream", "creek", "pond", "discolored", "foam"],
+    "soil pollution": ["soil", "ground", "dirt", "land", "contaminated soil", "farmland", "crops"],
+    "noise pollution": ["noise", "loud", "sound", "music", "construction noise", "night", "decibel"],
+    "oil spill": ["oil", "petroleum", "diesel", "crude", "slick", "oil spill", "fuel"],
+    "chemical spill": ["chemical", "toxic", "spill", "leak", "acid", "barrels", "chemical spill"],
+    "waste dumping": ["waste", "garbage", "trash", "dump", "dumping", "rubbish", "illegal dumping"],
+    "sewage overflow": ["sewage", "sewer", "manhole", "overflow", "feces", "raw sewage"],
+    "industrial emission": ["factory", "plant", "chimney", "smokestack", "industrial", "emission", "emissions"],
+    "plastic pollution": ["plastic", "bottles", "bags", "microplastics", "packaging", "plastic bags"],
+    "radioactive contamination": ["radioactive", "radiation", "nuclear", "geiger", "uranium", "reactor"]
+}
+
+SEED_SEVERITY_KEYWORDS = {
+    "low": ["small", "minor", "little", "occasional", "slight", "some"],
+    "medium": ["smell", "odor", "dirty", "bad", "regular", "every"],
+    "high": ["toxic", "dead fish", "dying", "poison", "large", "massive", "spreading", "sick"],
+    "critical": ["explosion", "fire", "deaths", "hospital", "evacuate", "evacuation", "emergency", "children sick"]
+}
+
+STOP_WORDS = frozenset(
+    "a an the and or but of to in on at by for from with is are was were be been it its this that "
+    "there here i we you he she they my our your their me us them near next very so just also "
+    "has have had do does did not no can could would should will about into over".split()
+)
+
+class _NaiveBayes:
+    """Multinomial naive Bayes over unigram and bigram counts."""
+    
+    def __init__(self, labels: List[str], alpha: float = 0.5):
+        self.labels = list(labels)
+        self.alpha = alpha
+        self.token_counts: Dict[str, Dict[str, float]] = {label: defaultdict(float) for label in self.labels}
+        self.label_totals: Dict[str, float] = {label: 0.0 for label in self.labels}
+        self.label_docs: Dict[str, float] = {label: 0.0 for label in self.labels}
+        self.vocabulary = set()
+    
+    def add(self, tokens: List[str], label: str, weight: float = 1.0):
+        if label not in self.label_totals:
+            return
+        for token in tokens:
+            self.token_counts[label][token] += weight
+            self.vocabulary.add(token)
+        self.label_totals[label] += weight * len(tokens)
+        self.label_docs[label] += 1
+    
+    def predict(self, tokens: List[str]) -> Tuple[Optional[str], float, int]:
+        """
+        Return the most likely label, its posterior probability and the
+        number of tokens the model knows.
+        """
+        
+        known = [token for token in tokens if token in self.vocabulary]
+        if not known:
+            return None, 0.0, 0
+        
+        vocabulary_size = len(self.vocabulary)
+        total_docs = sum(self.label_docs.values())
+        scores = {}
+        for label in self.labels:
+            denominator = self.label_totals[label] + self.alpha * vocabulary_size
+            counts = self.token_counts[label]
+            score = math.log((self.label_docs[label] + 1) / (total_docs + len(self.labels)))
+            for token in known:
+                score += math.log((counts.get(token, 0.0) + self.alpha) / denominator)
+            scores[label] = score
+        
+        # Softmax over the log scores
+        best = max(scores, key=scores.get)
+        peak = scores[best]
+        normalizer = sum(math.exp(score - peak) for score in scores.values())
+        return best, 1.0 / normalizer, len(known)
+
+class FastPathClassifier:
+    """
+    Local keyword classifier answering clear-cut reports without the LLM.
+    
+    Two naive Bayes models over unigrams and bigrams predict the pollution
+    type and the severity level. Both start from built-in seed keywords
+    and are retrained from the classifications already stored in
+    pollution_records, so the vocabulary follows what reporters actually
+    say. A prediction costs a few dictionary lookups; callers compare its
+    confidence (the posterior of the winning type) and its severity
+    confidence against thresholds and send everything below either one
+    to Cohere.
+    """
+    
+    def __init__(self, pollution_types: List[str], min_matches: int = 2, seed_weight: float = 3.0):
+        """
+        Args:
+            pollution_types: Labels the classifier may return
+            min_matches: Known tokens a text needs before any prediction is made
+            seed_weight: Weight of a seed keyword relative to one stored record
+        """
+        self.pollution_types = list(pollution_types)
+        self.min_matches = min_matches
+        self.seed_weight = seed_weight
+        
+        self.trained_records = 0
+        self._build([])
+    
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """Lowercase words without stop words, plus adjacent-word bigrams."""
+        
+        words = [word for word in re.findall(r"[a-z]+", text.lower()) if word not in STOP_WORDS and len(word) > 1]
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    
+    def train(self, records: Iterable[Tuple[str, str, str]]) -> int:
+        """
+        Rebuild both models from seed keywords plus stored classifications.
+        
+        Args:
+            records: (transcription, pollution_type, severity_level) tuples;
+                labels outside the known categories are skipped
+        
+        Returns:
+            Number of records used
+        """
+        
+        usable = [
+            (text, pollution_type, severity_level)
+            for text, pollution_type, severity_level in records
+            if text and pollution_type in self.pollution_types
+        ]
+        self._build(usable)
+        return self.trained_records
+    
+    def _build(self, records: List[Tuple[str, str, str]]):
+        types = _NaiveBayes(self.pollution_types)
+        severities = _NaiveBayes(list(SEED_SEVERITY_KEYWORDS))
+        
+        for label, keywords in SEED_TYPE_KEYWORDS.items():
+            types.add(keywords, label, self.seed_weight)
+        for label, keywords in SEED_SEVERITY_KEYWORDS.items():
+            severities.add(keywords, label, self.seed_weight)
+        
+        for text, pollution_type, severity_level in records:
+            tokens = self.tokenize(text)
+            types.add(tokens, pollution_type)
+            if severity_level:
+                severities.add(tokens, severity_level.lower())
+        
+        # Swap in whole models so concurrent predictions never see a partial build
+        self._types = types
+        self._severities = severities
+        self.trained_records = len(records)
+    
+    def classify(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Predict pollution type and severity.
+        
+        Returns:
+            Dictionary with pollution_type, severity_level, confidence and
+            severity_confidence, or None when the text has too few known
+            words for the type or none at all for the severity
+        """
+        
+        tokens = self.tokenize(text)
+        pollution_type, confidence, matched = self._types.predict(tokens)
+        if pollution_type is None or matched < self.min_matches:
+            return None
+        
+        # Never guess a severity the text gives no evidence for
+        severity_level, severity_confidence, _ = self._severities.predict(tokens)
+        if severity_level is None:
+            return None
+        return {
+            "pollution_type": pollution_type,
+            "severity_level": severity_level,
+            "confidence": round(confidence, 4),
+            "severity_confidence": round(severity_confidence, 4),
+            "matched_tokens": matched
+        }
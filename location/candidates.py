@@ -0,0 +1,299 @@
+import bisect
+import re
+from collections import deque
+from typing import Dict, List, Tuple
+
+# Place names recognized directly (cities and rivers worldwide), matched by
+# the keyword automaton rather than a 130-way regex alternation
+KNOWN_PLACES = [
+    "New York", "Los Angeles", "Chicago", "Houston", "Phoenix", "Philadelphia", "San Antonio",
+    "San Diego", "Dallas", "San Jose", "Austin", "Jacksonville", "Fort Worth", "Columbus",
+    "Charlotte", "San Francisco", "Indianapolis", "Seattle", "Denver", "Washington", "Boston",
+    "El Paso", "Nashville", "Detroit", "Oklahoma City", "Portland", "Las Vegas", "Memphis",
+    "Louisville", "Baltimore", "Milwaukee", "Albuquerque", "Tucson", "Fresno", "Sacramento",
+    "Mesa", "Kansas City", "Atlanta", "Long Beach", "Colorado Springs", "Raleigh", "Miami",
+    "Virginia Beach", "Omaha", "Oakland", "Minneapolis", "Tulsa", "Arlington", "Tampa",
+    "New Orleans", "Wichita", "Cleveland", "Bakersfield", "Aurora", "Anaheim", "Honolulu",
+    "Santa Ana", "Riverside", "Corpus Christi", "Lexington", "Stockton", "Henderson", "Saint Paul",
+    "St. Paul", "Cincinnati", "Pittsburgh", "Greensboro", "Anchorage", "Plano", "Lincoln",
+    "Orlando", "Irvine", "Newark", "Durham", "Chula Vista", "Toledo", "Fort Wayne",
+    "St. Petersburg", "Laredo", "Jersey City", "Chandler", "Madison", "Lubbock", "Scottsdale",
+    "Reno", "Buffalo", "Gilbert", "Glendale", "North Las Vegas", "Winston-Salem", "Chesapeake",
+    "Norfolk", "Fremont", "Garland", "Irving", "Hialeah", "Richmond", "Boise", "Spokane",
+    "Baton Rouge", "London", "Paris", "Berlin", "Tokyo", "Sydney", "Toronto", "Vancouver",
+    "Montreal", "Rhine River", "Thames", "Seine", "Danube", "Nile", "Amazon", "Mississippi",
+    "Colorado River", "Lahore", "Karachi", "Mumbai", "Delhi", "Beijing", "Shanghai", "Moscow",
+    "Istanbul", "Cairo", "Lagos", "Nairobi", "Cape Town", "Rio de Janeiro", "Buenos Aires",
+    "Mexico City", "Lima", "Bogota", "Santiago", "Brasilia"
+]
+
+RIVER_NAMES = [
+    "Rhine", "Thames", "Seine", "Danube", "Nile", "Amazon", "Mississippi", "Colorado",
+    "Yangtze", "Ganges", "Indus", "Mekong", "Volga", "Euphrates", "Tigris"
+]
+KNOWN_PLACE_WEIGHT = 100
+
+STREET_SUFFIX = r'(?:Street|St\.?|Avenue|Ave\.?|Road|Rd\.?|Boulevard|Blvd\.?|Drive|Dr\.?|Lane|Ln\.?|Way|Place|Pl\.?)'
+LANDMARK_SUFFIX = r'(?:Park|School|Hospital|Mall|Center|Centre|Plaza|Station|Airport|Bridge|Library|University|College)'
+
+# Leading words are bounded ({0,3}) instead of [A-Za-z\s]+ so long
+# transcripts cannot trigger quadratic backtracking. Patterns with an
+# anchor are only tried in a short window ending at each anchor hit
+# (e.g. "Street"), instead of at every word of the transcript.
+#
+# (name, pattern, weight, case sensitive, anchor)
+LOCATION_PATTERNS = [
+    ("coordinates", r'-?\d{1,2}\.\d+\s*,\s*-?\d{1,3}\.\d+', 95, False, None),
+    ("street_address", rf'\b\d+\s+(?:[A-Za-z]+\s+){{0,3}}{STREET_SUFFIX}', 90, False, rf'\b{STREET_SUFFIX}(?!\w)'),
+    ("intersection", r'\b(?:[A-Za-z]+\s+){1,3}(?:and|&|\+|at)\s+(?:[A-Za-z]+\s+){0,2}(?:Street|St\.?|Avenue|Ave\.?|Road|Rd\.?)', 85, False, r'\b(?:Street|St\.?|Avenue|Ave\.?|Road|Rd\.?)(?!\w)'),
+    ("city_state", r'\b((?:[A-Z][A-Za-z]*\s+){0,2}[A-Z][A-Za-z]*),\s*([A-Z]{2})\b', 80, True, None),
+    ("highway", r'\b(?:Highway|Hwy|Interstate|I-)\s*\d+\b', 80, False, None),
+    ("landmark", rf'\b(?:[A-Za-z]+\s+){{0,3}}{LANDMARK_SUFFIX}', 70, False, rf'\b{LANDMARK_SUFFIX}\b'),
+    ("street", r'\b(?:[A-Za-z]+\s+){1,3}(?:Street|Avenue|Road|Boulevard|Drive|Lane)', 70, False, r'\b(?:Street|Avenue|Road|Boulevard|Drive|Lane)\b'),
+    ("city_state_bare", r'\b((?:[A-Z][a-z]+\s+){0,2}[A-Z][a-z]+)\s+([A-Z]{2})\b', 65, True, None),
+    ("zip_code", r'\b(?:[A-Za-z]+\s+){1,3}\d{5}(?:-\d{4})?', 60, False, r'\b\d{5}(?:-\d{4})?\b'),
+    ("district", r'\b(?:downtown|uptown|midtown|suburb|neighborhood|district)(?:\s+[A-Za-z]+){1,3}', 60, False, None),
+    # At most five words, stopping at punctuation, a conjunction or the next preposition
+    ("preposition", r'\b(?:at|on|in|near|by|around|along)\s+((?:(?!(?:and|but|or|so|because|at|on|in|near|by|around|along)\b)[A-Za-z]+(?:\s+|\b)){1,5})', 40, False, None)
+]
+
+# Characters searched back from an anchor hit (enough for 3-4 leading words)
+ANCHOR_WINDOW = 64
+
+# Keywords that often precede a location; the rest of the sentence is a candidate
+LOCATION_KEYWORDS = [
+    'located', 'at', 'near', 'on', 'by', 'beside', 'next to', 'close to',
+    'intersection', 'corner', 'between', 'behind', 'in front of', 'across from',
+    'park', 'river', 'lake', 'beach', 'highway', 'freeway', 'street', 'avenue',
+    'downtown', 'uptown', 'city', 'town', 'area', 'neighborhood', 'district',
+    'building', 'plaza', 'mall', 'center', 'station', 'airport', 'bridge'
+]
+KEYWORD_WEIGHT = 30
+# Characters per word read after a keyword when collecting its phrase
+PHRASE_WINDOW_CHARS = 24
+
+# Words that never start a useful location phrase
+LEADING_STOPWORDS = {'the', 'a', 'an', 'at', 'on', 'in', 'near', 'by', 'to', 'from', 'of', 'and', 'is', 'was', 'there'}
+
+# Two-letter words that look like state codes in bare "City ST" matches
+STATE_CONTEXT_STOPWORDS = {'in', 'at', 'near', 'from', 'to'}
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton for multi-keyword search.
+    
+    Finds every occurrence of every keyword in a single left-to-right pass,
+    regardless of how many keywords there are.
+    """
+    
+    def __init__(self, keywords: List[str]):
+        """
+        Build goto, failure and output tables.
+        
+        Args:
+            keywords: Lowercase keywords to search for
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        
+        for keyword in keywords:
+            state = 0
+            for char in keyword:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].append(keyword)
+        
+        # Breadth-first pass to compute failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+    
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """
+        Find all keyword occurrences.
+        
+        Args:
+            text: Lowercase text to scan
+            
+        Returns:
+            List of (start, end, keyword) tuples in order of end position
+        """
+        
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword in self._output[state]:
+                matches.append((index - len(keyword) + 1, index + 1, keyword))
+        return matches
+
+class CandidateExtractor:
+    """
+    Compiled, single-pass location candidate extractor.
+    
+    All patterns are compiled once at construction. Extraction makes one
+    Aho-Corasick pass for every known place name and location keyword,
+    one scan per remaining pattern (suffix-anchored where possible), then
+    merges the hits into a deduplicated list ranked by how reliable the
+    matching pattern is.
+    """
+    
+    def __init__(self, max_candidates: int = 12, max_phrase_words: int = 6):
+        """
+        Compile patterns and the keyword automaton.
+        
+        Args:
+            max_candidates: Maximum candidates returned
+            max_phrase_words: Word cap for free-text phrases after keywords
+        """
+        self.max_candidates = max_candidates
+        self.max_phrase_words = max_phrase_words
+        
+        self.patterns = []
+        for name, pattern, weight, case_sensitive, anchor in LOCATION_PATTERNS:
+            flags = 0 if case_sensitive else re.IGNORECASE
+            if anchor:
+                # Anchored patterns must end exactly where the anchor hit ends
+                self.patterns.append((name, re.compile(pattern + '$', flags), weight, re.compile(anchor, flags)))
+            else:
+                self.patterns.append((name, re.compile(pattern, flags), weight, None))
+        
+        # One automaton for location keywords and known place names
+        self.place_terms = {place.lower(): place for place in KNOWN_PLACES}
+        self.place_terms.update({f"{river.lower()} river": f"{river} River" for river in RIVER_NAMES})
+        self.keyword_terms = set(LOCATION_KEYWORDS)
+        self.keywords = KeywordAutomaton(sorted(self.keyword_terms | set(self.place_terms)))
+        
+        self.sentence_end = re.compile(r'[.!?]+')
+        self.whitespace = re.compile(r'\s+')
+    
+    def extract(self, text: str) -> List[str]:
+        """
+        Extract ranked location candidates.
+        
+        Args:
+            text: Transcribed text
+            
+        Returns:
+            Candidate strings, most promising first
+        """
+        return [candidate for candidate, _, _ in self.extract_scored(text)]
+    
+    def extract_scored(self, text: str) -> List[Tuple[str, float, str]]:
+        """
+        Extract ranked location candidates with their scores.
+        
+        Args:
+            text: Transcribed text
+            
+        Returns:
+            List of (candidate, score, source pattern name), best first
+        """
+        
+        # key -> (score, position, candidate, source)
+        best: Dict[str, Tuple[float, int, str, str]] = {}
+        
+        def add(candidate: str, position: int, weight: float, source: str):
+            candidate = self._clean(candidate)
+            if len(candidate) <= 3:
+                return
+            key = candidate.lower().strip(' ,.')
+            score = self._score(candidate, weight)
+            current = best.get(key)
+            if current is None or score > current[0]:
+                best[key] = (score, position if current is None else min(position, current[1]), candidate, source)
+        
+        for name, pattern, weight, anchor in self.patterns:
+            for match in self._find(text, pattern, anchor):
+                if name in ("city_state", "city_state_bare"):
+                    city, state = match.group(1).strip(), match.group(2)
+                    if city.lower() in STATE_CONTEXT_STOPWORDS:
+                        continue
+                    add(f"{city}, {state}", match.start(), weight, name)
+                elif name == "preposition":
+                    add(match.group(1), match.start(1), weight, name)
+                else:
+                    add(match.group(0), match.start(), weight, name)
+        
+        self._scan_keywords(text, add)
+        
+        ranked = sorted(best.values(), key=lambda item: (-item[0], item[1]))
+        return [(candidate, score, source) for score, _, candidate, source in ranked[:self.max_candidates]]
+    
+    def _find(self, text: str, pattern: re.Pattern, anchor: re.Pattern):
+        """Yield pattern matches, only searching near anchor hits for anchored patterns."""
+        
+        if anchor is None:
+            yield from pattern.finditer(text)
+            return
+        
+        for hit in anchor.finditer(text):
+            match = pattern.search(text, max(0, hit.start() - ANCHOR_WINDOW), hit.end())
+            if match:
+                yield match
+    
+    def _scan_keywords(self, text: str, add):
+        """
+        Single automaton pass for known place names and location keywords.
+        
+        Place names become candidates directly; for keywords, the words that
+        follow (up to the end of the sentence) become a candidate.
+        """
+        
+        lowered = text.lower()
+        sentence_ends = [match.start() for match in self.sentence_end.finditer(text)]
+        
+        for start, end, term in self.keywords.find_all(lowered):
+            # Whole words only ("at" must not match inside "water")
+            if (start > 0 and lowered[start - 1].isalnum()) or (end < len(lowered) and lowered[end].isalnum()):
+                continue
+            
+            if term in self.place_terms:
+                add(text[start:end], start, KNOWN_PLACE_WEIGHT, "known_place")
+            
+            if term in self.keyword_terms:
+                index = bisect.bisect_left(sentence_ends, end)
+                sentence_stop = sentence_ends[index] if index < len(sentence_ends) else len(text)
+                # Only a window is split, so unpunctuated transcripts stay linear
+                phrase_stop = min(sentence_stop, end + PHRASE_WINDOW_CHARS * self.max_phrase_words)
+                words = text[end:phrase_stop].split()[:self.max_phrase_words]
+                if words:
+                    add(" ".join(words), end, KEYWORD_WEIGHT, "keyword")
+    
+    def _clean(self, candidate: str) -> str:
+        """Normalize whitespace and drop filler words in front of the place name."""
+        
+        words = self.whitespace.sub(' ', candidate).strip(' ,.').split(' ')
+        
+        # "oil near Main Street" -> "Main Street" when a proper noun follows
+        while len(words) > 2 and words[0][:1].islower() and any(word[:1].isupper() for word in words[1:-1]):
+            words = words[1:]
+        while len(words) > 1 and words[0].lower() in LEADING_STOPWORDS:
+            words = words[1:]
+        
+        return " ".join(words)
+    
+    def _score(self, candidate: str, weight: float) -> float:
+        """Prefer proper nouns and short, specific phrases."""
+        
+        words = candidate.split(' ')
+        score = float(weight)
+        if any(word[:1].isupper() for word in words):
+            score += 5
+        if len(words) > 5:
+            score -= 2 * (len(words) - 5)
+        return score
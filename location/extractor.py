@@ -1,10 +1,16 @@
 import re
+import os
 import geocoder
 from geopy.geocoders import Nominatim
 from typing import Dict, Optional, Tuple, Any
 import asyncio
 import time
 
+from .candidates import CandidateExtractor
+from .gazetteer import Gazetteer
+from .geocode_cache import GeocodeCache
+from .geocode_scheduler import GeocodeProvider, GeocodeScheduler
+
 class LocationExtractor:
     """
     Extract and geocode location information from text descriptions.
@@ -17,41 +23,32 @@ class LocationExtractor:
         """Initialize geocoding services."""
         self.geolocator = Nominatim(user_agent="pollution_analyzer_v1.0", timeout=10)
         
-        # Enhanced location patterns with more comprehensive matching
-        self.location_patterns = [
-            # Street addresses with numbers
-            r'\b\d+\s+[A-Za-z\s]+(Street|St\.?|Avenue|Ave\.?|Road|Rd\.?|Boulevard|Blvd\.?|Drive|Dr\.?|Lane|Ln\.?|Way|Place|Pl\.?)\b',
-            # Intersections
-            r'\b[A-Za-z\s]+\s+(?:and|&|\+|at)\s+[A-Za-z\s]+(?:Street|St\.?|Avenue|Ave\.?|Road|Rd\.?)\b',
-            # Near landmarks
-            r'\bnear\s+[A-Za-z\s]+(?:Park|School|Hospital|Mall|Center|Centre|Plaza|Station|Airport|Bridge|Library|University|College)\b',
-            # City, State patterns
-            r'\b[A-Za-z\s]+,\s*[A-Z]{2}\b',
-            # City names (common cities worldwide)
-            r'\b(?:New York|Los Angeles|Chicago|Houston|Phoenix|Philadelphia|San Antonio|San Diego|Dallas|San Jose|Austin|Jacksonville|Fort Worth|Columbus|Charlotte|San Francisco|Indianapolis|Seattle|Denver|Washington|Boston|El Paso|Nashville|Detroit|Oklahoma City|Portland|Las Vegas|Memphis|Louisville|Baltimore|Milwaukee|Albuquerque|Tucson|Fresno|Sacramento|Mesa|Kansas City|Atlanta|Long Beach|Colorado Springs|Raleigh|Miami|Virginia Beach|Omaha|Oakland|Minneapolis|Tulsa|Arlington|Tampa|New Orleans|Wichita|Cleveland|Bakersfield|Aurora|Anaheim|Honolulu|Santa Ana|Riverside|Corpus Christi|Lexington|Stockton|Henderson|Saint Paul|St\. Paul|Cincinnati|Pittsburgh|Greensboro|Anchorage|Plano|Lincoln|Orlando|Irvine|Newark|Durham|Chula Vista|Toledo|Fort Wayne|St\. Petersburg|Laredo|Jersey City|Chandler|Madison|Lubbock|Scottsdale|Reno|Buffalo|Gilbert|Glendale|North Las Vegas|Winston-Salem|Chesapeake|Norfolk|Fremont|Garland|Irving|Hialeah|Richmond|Boise|Spokane|Baton Rouge|London|Paris|Berlin|Tokyo|Sydney|Toronto|Vancouver|Montreal|Rhine River|Thames|Seine|Danube|Nile|Amazon|Mississippi|Colorado River|Lahore|Karachi|Mumbai|Delhi|Beijing|Shanghai|Moscow|Istanbul|Cairo|Lagos|Nairobi|Cape Town|Rio de Janeiro|Buenos Aires|Mexico City|Lima|Bogota|Santiago|Brasilia)\b',
-            # Rivers and water bodies
-            r'\b(?:Rhine|Thames|Seine|Danube|Nile|Amazon|Mississippi|Colorado|Yangtze|Ganges|Indus|Mekong|Volga|Euphrates|Tigris)\s+River\b',
-            # Coordinates (lat, lon)
-            r'\b-?\d+\.?\d*\s*,\s*-?\d+\.?\d*\b',
-            # Zip codes in addresses
-            r'\b[A-Za-z\s]+\s+\d{5}(?:-\d{4})?\b',
-            # Highway/Interstate references
-            r'\b(?:Highway|Hwy|Interstate|I-)\s*\d+\b',
-            # General location indicators
-            r'\b(?:downtown|uptown|midtown|suburb|neighborhood|district)\s+[A-Za-z\s]+\b'
-        ]
+        # Persistent cache of geocoding results, including negative results
+        self.geocode_cache = None
+        if os.getenv("GEOCODE_CACHE_ENABLED", "true").lower() == "true":
+            self.geocode_cache = GeocodeCache(
+                os.getenv("GEOCODE_CACHE_DB", "./geocode_cache.db"),
+                ttl=float(os.getenv("GEOCODE_CACHE_TTL", "2592000")),
+                negative_ttl=float(os.getenv("GEOCODE_NEGATIVE_TTL", "86400"))
+            )
         
-        # Enhanced location keywords
-        self.location_keywords = [
-            'located', 'at', 'near', 'on', 'by', 'beside', 'next to', 'close to',
-            'intersection', 'corner', 'between', 'behind', 'in front of', 'across from',
-            'park', 'river', 'lake', 'beach', 'highway', 'freeway', 'street', 'avenue',
-            'downtown', 'uptown', 'city', 'town', 'area', 'neighborhood', 'district',
-            'building', 'plaza', 'mall', 'center', 'station', 'airport', 'bridge'
-        ]
+        # Offline place-name index, consulted before any cache or network lookup
+        self.gazetteer = None
+        gazetteer_path = os.getenv("GAZETTEER_DB", "./gazetteer.db")
+        if os.path.exists(gazetteer_path):
+            try:
+                self.gazetteer = Gazetteer(gazetteer_path)
+                print(f"Gazetteer loaded: {self.gazetteer.size} places")
+            except Exception as e:
+                print(f"⚠️ Gazetteer unavailable: {str(e)}")
+        
+        # Concurrent provider fan-out under per-service rate limits
+        self.scheduler = self._build_scheduler()
         
-        # Common location prepositions
-        self.location_prepositions = ['at', 'on', 'in', 'near', 'by', 'around', 'along']
+        # Precompiled candidate extraction engine
+        self.candidate_extractor = CandidateExtractor(
+            max_candidates=int(os.getenv("LOCATION_MAX_CANDIDATES", "12"))
+        )
     
     async def extract_location(self, text: str) -> Dict[str, Optional[str]]:
         """
@@ -67,45 +64,22 @@ class LocationExtractor:
         try:
             print(f"🔍 Extracting location from: {text[:100]}...")
             
-            # Step 1: Extract potential location strings from text
-            location_candidates = self._extract_location_strings(text)
+            # Step 1: Extract ranked location candidates in one pass over the text
+            location_candidates = self.candidate_extractor.extract(text)
             print(f"📍 Found {len(location_candidates)} location candidates: {location_candidates}")
             
             if not location_candidates:
                 # Try extracting from the entire text as a fallback
                 location_candidates = [text.strip()]
             
-            # Step 2: Try to geocode each candidate
-            for i, candidate in enumerate(location_candidates):
-                print(f"🌐 Geocoding candidate {i+1}: '{candidate}'")
-                location_data = await self._geocode_location(candidate)
-                
-                if location_data["latitude"] and location_data["longitude"]:
-                    location_data["extracted_text"] = candidate
-                    print(f"✅ Successfully geocoded: {location_data}")
-                    return location_data
-                else:
-                    print(f"❌ Failed to geocode: '{candidate}'")
+            # Step 2: Geocode all candidates concurrently, keeping the best-ranked success
+            geocoded = await self._geocode_candidates(location_candidates)
             
-            # Step 3: Try extracting city/state patterns specifically
-            city_state_candidates = self._extract_city_state_patterns(text)
-            for candidate in city_state_candidates:
-                print(f"🏙️ Trying city/state pattern: '{candidate}'")
-                location_data = await self._geocode_location(candidate)
-                if location_data["latitude"] and location_data["longitude"]:
-                    location_data["extracted_text"] = candidate
-                    print(f"✅ City/state geocoded: {location_data}")
-                    return location_data
-            
-            # Step 4: Try common location extraction patterns
-            common_locations = self._extract_common_locations(text)
-            for candidate in common_locations:
-                print(f"🏢 Trying common location: '{candidate}'")
-                location_data = await self._geocode_location(candidate)
-                if location_data["latitude"] and location_data["longitude"]:
-                    location_data["extracted_text"] = candidate
-                    print(f"✅ Common location geocoded: {location_data}")
-                    return location_data
+            if geocoded:
+                candidate, location_data = geocoded
+                location_data["extracted_text"] = candidate
+                print(f"✅ Successfully geocoded: {location_data}")
+                return location_data
             
             print("❌ No location could be extracted and geocoded")
             return self._empty_location_result()
@@ -120,206 +94,182 @@ class LocationExtractor:
                 "error": str(e)
             }
     
-    def _extract_location_strings(self, text: str) -> list:
-        """Extract potential location strings using pattern matching."""
+    async def _geocode_location(self, location_string: str) -> Dict[str, Optional[str]]:
+        """
+        Geocode a location string to coordinates and address.
         
-        candidates = []
-        text_clean = text.strip()
+        Args:
+            location_string: String describing a location
+            
+        Returns:
+            Dictionary with geocoding results
+        """
         
-        # Extract using regex patterns
-        for pattern in self.location_patterns:
-            matches = re.findall(pattern, text_clean, re.IGNORECASE)
-            if matches:
-                candidates.extend(matches)
+        geocoded = await self._geocode_candidates([location_string])
+        if geocoded:
+            return geocoded[1]
+        return self._empty_location_result()
+    
+    async def _geocode_candidates(self, candidates: list) -> Optional[Tuple[str, Dict[str, Optional[str]]]]:
+        """
+        Geocode the first candidate, in list order, that any source can resolve.
         
-        # Extract sentences containing location keywords
-        sentences = re.split(r'[.!?]+', text_clean)
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if any(keyword in sentence.lower() for keyword in self.location_keywords):
-                # Extract the part after location keywords
-                for keyword in self.location_keywords:
-                    if keyword in sentence.lower():
-                        parts = sentence.lower().split(keyword)
-                        if len(parts) > 1:
-                            potential_location = parts[1].strip()
-                            # Clean up the extracted location
-                            potential_location = re.sub(r'^(the|a|an)\s+', '', potential_location, flags=re.IGNORECASE)
-                            potential_location = re.sub(r'\s+', ' ', potential_location)  # Normalize whitespace
-                            if len(potential_location) > 3:  # Avoid very short extractions
-                                candidates.append(potential_location)
+        Candidates are walked in priority order. The first one answered
+        locally, by the offline gazetteer or a positive cache entry, ends
+        the walk; candidates ranked above it that are not known negatives
+        go to the provider scheduler together, and any network winner
+        among them outranks the local answer. A local answer therefore
+        only skips the network when it is the top unresolved candidate.
         
-        # Extract location phrases after prepositions
-        for prep in self.location_prepositions:
-            pattern = rf'\b{prep}\s+([A-Za-z\s,]+?)(?:\.|,|$|\s+(?:and|but|or|so|because))'
-            matches = re.findall(pattern, text_clean, re.IGNORECASE)
-            for match in matches:
-                clean_match = match.strip().rstrip(',.')
-                if len(clean_match) > 3:
-                    candidates.append(clean_match)
+        Args:
+            candidates: Candidate location strings in priority order
+            
+        Returns:
+            Tuple of (candidate, location result), or None if nothing resolved
+        """
         
-        # Remove duplicates and sort by length (longer strings first)
-        candidates = list(set(candidates))
-        candidates = [c for c in candidates if len(c.strip()) > 2]  # Filter out very short candidates
-        candidates.sort(key=len, reverse=True)
+        # Deduplicate while keeping priority order
+        seen = set()
+        unique_candidates = []
+        for candidate in candidates:
+            candidate = candidate.strip()
+            if len(candidate) >= 2 and candidate not in seen:
+                seen.add(candidate)
+                unique_candidates.append(candidate)
         
-        return candidates[:8]  # Limit to top 8 candidates
-    
-    def _extract_city_state_patterns(self, text: str) -> list:
-        """Extract city, state patterns specifically."""
+        to_resolve = []
+        local_winner = None
+        for candidate in unique_candidates:
+            local = self.gazetteer.lookup(candidate) if self.gazetteer else None
+            if local:
+                print(f"   📖 Gazetteer hit for: '{candidate}'")
+                local_winner = (candidate, local)
+                break
+            
+            cached = await self._cache_get(candidate)
+            if cached is None:
+                to_resolve.append(candidate)
+            elif cached["latitude"] and cached["longitude"]:
+                print(f"   💾 Geocode cache hit for: '{candidate}'")
+                local_winner = (candidate, cached)
+                break
+            # Negative hits are skipped without touching the network
         
-        candidates = []
+        if not to_resolve:
+            return local_winner
         
-        # Look for City, State patterns
-        city_state_pattern = r'\b([A-Za-z\s]+),\s*([A-Z]{2})\b'
-        matches = re.findall(city_state_pattern, text)
-        for city, state in matches:
-            candidates.append(f"{city.strip()}, {state}")
+        print(f"🌐 Geocoding {len(to_resolve)} candidates across {len(self.scheduler.providers)} providers")
+        winner, negatives = await self.scheduler.resolve(to_resolve)
         
-        # Look for just state abbreviations and try to extract nearby city names
-        state_pattern = r'\b[A-Z]{2}\b'
-        states = re.findall(state_pattern, text)
-        for state in states:
-            # Look for words before the state that might be city names
-            state_context_pattern = rf'\b([A-Za-z\s]+)\s+{state}\b'
-            city_matches = re.findall(state_context_pattern, text)
-            for city in city_matches:
-                city = city.strip()
-                if len(city) > 2 and not city.lower() in ['in', 'at', 'near', 'from', 'to']:
-                    candidates.append(f"{city}, {state}")
+        for candidate in negatives:
+            await self._cache_set(candidate, self._empty_location_result())
+        if winner:
+            await self._cache_set(*winner)
+            # Every unresolved candidate precedes the local hit, so a network winner outranks it
+            return winner
+        return local_winner
+    
+    async def _cache_get(self, location_string: str) -> Optional[Dict[str, Optional[str]]]:
+        """Read from the geocode cache, treating cache errors as misses."""
         
-        return candidates
+        if not self.geocode_cache:
+            return None
+        try:
+            return await self.geocode_cache.get(location_string)
+        except Exception as e:
+            print(f"   ⚠️ Geocode cache read failed: {str(e)}")
+            return None
     
-    def _extract_common_locations(self, text: str) -> list:
-        """Extract common location types and landmarks."""
+    async def _cache_set(self, location_string: str, result: Dict[str, Optional[str]]):
+        """Write to the geocode cache, ignoring cache errors."""
         
-        candidates = []
+        if not self.geocode_cache:
+            return
+        try:
+            await self.geocode_cache.set(location_string, result)
+        except Exception as e:
+            print(f"   ⚠️ Geocode cache write failed: {str(e)}")
+    
+    async def _geocode_nominatim(self, location_string: str) -> Optional[Dict[str, Optional[str]]]:
+        """Geocode with Nominatim (OpenStreetMap) - most reliable."""
         
-        # Look for specific landmark types
-        landmark_patterns = [
-            r'\b([A-Za-z\s]+(?:Park|School|Hospital|Mall|Center|Plaza|Station|Airport|Bridge|Library|University|College))\b',
-            r'\b([A-Za-z\s]+(?:Street|Avenue|Road|Boulevard|Drive|Lane))\b',
-            r'\b(downtown|uptown|midtown)\s+([A-Za-z\s]+)\b'
-        ]
+        location = await asyncio.to_thread(
+            self.geolocator.geocode, 
+            location_string, 
+            timeout=10,
+            exactly_one=True
+        )
         
-        for pattern in landmark_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if isinstance(matches[0] if matches else None, tuple):
-                # Handle tuple matches (from grouped patterns)
-                for match_tuple in matches:
-                    for match in match_tuple:
-                        if match and len(match.strip()) > 3:
-                            candidates.append(match.strip())
-            else:
-                # Handle simple string matches
-                candidates.extend([m.strip() for m in matches if len(m.strip()) > 3])
+        if not location:
+            return None
         
-        return candidates
+        return {
+            "latitude": str(location.latitude),
+            "longitude": str(location.longitude),
+            "address": location.address,
+            "confidence": "high",
+            "provider": "nominatim"
+        }
     
-    async def _geocode_location(self, location_string: str) -> Dict[str, Optional[str]]:
-        """
-        Geocode a location string to coordinates and address.
+    async def _geocode_with_geocoder(self, provider_key: str, location_string: str) -> Optional[Dict[str, Optional[str]]]:
+        """Geocode with one of the geocoder library providers."""
         
-        Args:
-            location_string: String describing a location
-            
-        Returns:
-            Dictionary with geocoding results
-        """
-        
-        if not location_string or len(location_string.strip()) < 2:
-            return self._empty_location_result()
+        # Each geocoder provider has its own function
+        result = await asyncio.to_thread(getattr(geocoder, provider_key), location_string)
         
-        location_string = location_string.strip()
+        if not (result and result.latlng and len(result.latlng) >= 2):
+            return None
         
-        try:
-            # First try with Nominatim (OpenStreetMap) - most reliable
-            print(f"   🌍 Trying Nominatim for: '{location_string}'")
-            location = await asyncio.to_thread(
-                self.geolocator.geocode, 
-                location_string, 
-                timeout=10,
-                exactly_one=True
-            )
-            
-            if location:
-                result = {
-                    "latitude": str(location.latitude),
-                    "longitude": str(location.longitude),
-                    "address": location.address,
-                    "confidence": "high"
-                }
-                print(f"   ✅ Nominatim success: {result}")
-                return result
-            
-            # Add small delay to respect rate limits
-            await asyncio.sleep(0.5)
-            
-            # Fallback to geocoder library with multiple providers
-            print(f"   🔄 Trying fallback geocoding for: '{location_string}'")
-            return await self._fallback_geocoding(location_string)
-            
-        except Exception as e:
-            print(f"   ❌ Geocoding error for '{location_string}': {str(e)}")
-            # Try fallback even if Nominatim fails
-            try:
-                return await self._fallback_geocoding(location_string)
-            except:
-                return {
-                    "latitude": None,
-                    "longitude": None,
-                    "address": None,
-                    "confidence": "failed",
-                    "error": str(e)
-                }
+        return {
+            "latitude": str(result.latlng[0]),
+            "longitude": str(result.latlng[1]),
+            "address": result.address or location_string,
+            "confidence": "medium",
+            "provider": provider_key
+        }
     
-    async def _fallback_geocoding(self, location_string: str) -> Dict[str, Optional[str]]:
-        """Fallback geocoding using geocoder library with correct API."""
+    def _build_scheduler(self) -> GeocodeScheduler:
+        """Create the provider scheduler with per-service rate limits."""
         
-        providers = [
-            ('osm', 'OpenStreetMap'),
-            ('arcgis', 'ArcGIS'),
-            ('bing', 'Bing Maps'),
-            ('google', 'Google Maps')
+        fallback_providers = [
+            ('osm', 'OpenStreetMap', 'nominatim'),
+            ('arcgis', 'ArcGIS', 'arcgis'),
+            ('bing', 'Bing Maps', 'bing'),
+            ('google', 'Google Maps', 'google')
         ]
         
-        for provider_key, provider_name in providers:
-            try:
-                print(f"   🔄 Trying {provider_name}...")
-                
-                # Use the correct geocoder API - each provider has its own method
-                if provider_key == 'osm':
-                    result = await asyncio.to_thread(geocoder.osm, location_string)
-                elif provider_key == 'arcgis':
-                    result = await asyncio.to_thread(geocoder.arcgis, location_string)
-                elif provider_key == 'bing':
-                    result = await asyncio.to_thread(geocoder.bing, location_string)
-                elif provider_key == 'google':
-                    result = await asyncio.to_thread(geocoder.google, location_string)
-                else:
-                    continue
-                
-                if result and result.latlng and len(result.latlng) >= 2:
-                    geocoded_result = {
-                        "latitude": str(result.latlng[0]),
-                        "longitude": str(result.latlng[1]),
-                        "address": result.address or location_string,
-                        "confidence": "medium"
-                    }
-                    print(f"   ✅ {provider_name} success: {geocoded_result}")
-                    return geocoded_result
-                else:
-                    print(f"   ❌ {provider_name} returned no results")
-                    
-                # Small delay between providers
-                await asyncio.sleep(0.3)
-                    
-            except Exception as e:
-                print(f"   ❌ {provider_name} error: {str(e)}")
-                continue
+        providers = [GeocodeProvider('Nominatim', self._geocode_nominatim, 'nominatim')]
+        for provider_key, provider_name, bucket in fallback_providers:
+            providers.append(GeocodeProvider(
+                provider_name,
+                lambda location_string, key=provider_key: self._geocode_with_geocoder(key, location_string),
+                bucket
+            ))
         
-        print("   ❌ All fallback providers failed")
-        return self._empty_location_result()
+        # geopy's Nominatim and geocoder.osm hit the same service, so they share
+        # one bucket at the 1 request/second usage policy
+        rate_limits = {'nominatim': 1.0, 'arcgis': 5.0, 'bing': 5.0, 'google': 10.0}
+        for item in os.getenv("GEOCODE_RATE_LIMITS", "").split(","):
+            if "=" in item:
+                bucket, rate = item.split("=", 1)
+                rate_limits[bucket.strip()] = float(rate)
+        
+        return GeocodeScheduler(providers, rate_limits)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Report gazetteer, geocoding cache and scheduler statistics."""
+        return {
+            "gazetteer": self.gazetteer.get_stats() if self.gazetteer else {"enabled": False},
+            "cache": self.geocode_cache.get_stats() if self.geocode_cache else {"enabled": False},
+            "scheduler": self.scheduler.get_stats()
+        }
+    
+    async def close(self):
+        """Close the gazetteer and geocode cache."""
+        if self.gazetteer:
+            self.gazetteer.close()
+        if self.geocode_cache:
+            await self.geocode_cache.close()
     
     def _empty_location_result(self) -> Dict[str, Optional[str]]:
         """Return empty location result structure."""
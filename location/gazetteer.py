@@ -0,0 +1,203 @@
+import argparse
+import os
+import re
+import sqlite3
+import time
+from typing import Any, Dict, Optional
+
+# GeoNames feature classes we index and what they are called in results
+FEATURE_KINDS = {
+    "P": "city",
+    "H": "water",
+    "S": "landmark",
+    "L": "area"
+}
+
+class Gazetteer:
+    """
+    Offline place-name index for instant local geocoding.
+    
+    A compact SQLite index mapping normalized city, river and landmark
+    names to coordinates, built from a GeoNames-style dump with
+    Gazetteer.build(). Lookups are a single indexed query, so known names
+    resolve in well under a millisecond and keep working with the network
+    down.
+    """
+    
+    def __init__(self, db_path: str):
+        """
+        Open an existing gazetteer index read-only.
+        
+        Args:
+            db_path: Path to a database created by Gazetteer.build()
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self.size = self._conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+        
+        self._hits = 0
+        self._misses = 0
+        self._total_lookup = 0.0
+    
+    @staticmethod
+    def normalize(name: str) -> str:
+        """Normalize a place name for indexing and lookup."""
+        
+        name = re.sub(r'\s+', ' ', name.lower()).strip(' ,.;:!?')
+        return re.sub(r'^the ', '', name)
+    
+    def lookup(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve a place name locally.
+        
+        Args:
+            name: Candidate location string
+            
+        Returns:
+            Location result, or None if the name is not in the index
+        """
+        
+        started = time.perf_counter()
+        normalized = self.normalize(name)
+        
+        # "Thames River" is indexed as "River Thames" or just "Thames"
+        variants = [normalized]
+        if normalized.endswith(" river"):
+            base = normalized[:-len(" river")]
+            variants += [f"river {base}", base]
+        
+        row = None
+        for variant in variants:
+            row = self._conn.execute("""
+                SELECT p.name, p.kind, p.latitude, p.longitude, p.country
+                FROM names n JOIN places p ON p.id = n.place_id
+                WHERE n.name = ?
+                ORDER BY p.population DESC
+                LIMIT 1
+            """, (variant,)).fetchone()
+            if row:
+                break
+        
+        self._total_lookup += time.perf_counter() - started
+        if row is None:
+            self._misses += 1
+            return None
+        
+        self._hits += 1
+        place_name, kind, latitude, longitude, country = row
+        return {
+            "latitude": str(latitude),
+            "longitude": str(longitude),
+            "address": f"{place_name}, {country}" if country else place_name,
+            "confidence": "high",
+            "provider": "gazetteer",
+            "kind": kind
+        }
+    
+    def close(self):
+        """Close the index."""
+        self._conn.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Report index size and lookup counters."""
+        
+        lookups = self._hits + self._misses
+        return {
+            "places": self.size,
+            "hits": self._hits,
+            "misses": self._misses,
+            "avg_lookup_us": round(self._total_lookup / lookups * 1e6, 1) if lookups else 0.0
+        }
+    
+    @staticmethod
+    def build(dump_path: str, db_path: str, min_population: int = 15000, alternate_names: bool = True) -> int:
+        """
+        Build a gazetteer index from a GeoNames dump.
+        
+        Expects the tab-separated GeoNames layout (allCountries.txt,
+        cities15000.txt, ...): id, name, asciiname, alternatenames,
+        latitude, longitude, feature class, feature code, country code,
+        ..., population.
+        
+        Args:
+            dump_path: GeoNames dump file
+            db_path: Output SQLite file (replaced if it exists)
+            min_population: Minimum population for populated places
+            alternate_names: Also index alternate and ASCII names
+            
+        Returns:
+            Number of places indexed
+        """
+        
+        if os.path.exists(db_path):
+            os.unlink(db_path)
+        
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE places (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL,
+                country TEXT,
+                population INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE names (
+                name TEXT NOT NULL,
+                place_id INTEGER NOT NULL,
+                PRIMARY KEY (name, place_id)
+            ) WITHOUT ROWID;
+        """)
+        
+        count = 0
+        with open(dump_path, encoding="utf-8") as dump:
+            for line in dump:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 15:
+                    continue
+                
+                kind = FEATURE_KINDS.get(fields[6])
+                if kind is None:
+                    continue
+                if fields[7] == "STM":
+                    kind = "river"
+                
+                population = int(fields[14] or 0)
+                if kind == "city" and population < min_population:
+                    continue
+                
+                place_id = int(fields[0])
+                conn.execute(
+                    "INSERT INTO places VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (place_id, fields[1], kind, float(fields[4]), float(fields[5]), fields[8], population)
+                )
+                
+                names = {Gazetteer.normalize(fields[1])}
+                if alternate_names:
+                    names.add(Gazetteer.normalize(fields[2]))
+                    names.update(Gazetteer.normalize(alt) for alt in fields[3].split(",") if alt and len(alt) <= 64)
+                conn.executemany(
+                    "INSERT OR IGNORE INTO names VALUES (?, ?)",
+                    [(name, place_id) for name in names if name]
+                )
+                count += 1
+        
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+        return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline gazetteer index from a GeoNames dump.")
+    parser.add_argument("dump", help="GeoNames dump file, e.g. cities15000.txt or allCountries.txt")
+    parser.add_argument("--db", default=os.getenv("GAZETTEER_DB", "./gazetteer.db"), help="Output SQLite file")
+    parser.add_argument("--min-population", type=int, default=15000, help="Minimum population for cities")
+    parser.add_argument("--no-alternate-names", action="store_true", help="Index primary names only")
+    args = parser.parse_args()
+    
+    count = Gazetteer.build(args.dump, args.db, args.min_population, not args.no_alternate_names)
+    print(f"Indexed {count} places into {args.db}")
+
+if __name__ == "__main__":
+    main()
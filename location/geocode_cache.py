@@ -0,0 +1,142 @@
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, Optional
+
+import aiosqlite
+
+class GeocodeCache:
+    """
+    Persistent SQLite cache of geocoding results.
+    
+    Keys are normalized candidate strings. Successful lookups are stored
+    with the provider and confidence that produced them; candidates that
+    every provider answered with "no result" are stored as negative
+    entries with a shorter TTL so they stop costing a full provider chain.
+    """
+    
+    def __init__(self, db_path: str, ttl: float = 2592000, negative_ttl: float = 86400):
+        """
+        Initialize cache settings. The database is opened on first use.
+        
+        Args:
+            db_path: SQLite file holding the cache
+            ttl: Seconds a positive result stays valid
+            negative_ttl: Seconds a negative result stays valid
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        
+        self._db: Optional[aiosqlite.Connection] = None
+        self._db_lock = asyncio.Lock()
+        
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._stores = 0
+    
+    @staticmethod
+    def normalize(location_string: str) -> str:
+        """Normalize a candidate so case and spacing variants share an entry."""
+        
+        normalized = re.sub(r'\s+', ' ', location_string.lower()).strip()
+        return normalized.strip(' ,.;:!?')
+    
+    async def get(self, location_string: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a candidate.
+        
+        Args:
+            location_string: Candidate location text
+            
+        Returns:
+            Cached location result (negative entries have no coordinates), or None on a miss
+        """
+        
+        db = await self._get_db()
+        cursor = await db.execute(
+            "SELECT result, negative, expires_at FROM geocode_cache WHERE query = ?",
+            (self.normalize(location_string),)
+        )
+        row = await cursor.fetchone()
+        
+        if row is None or row[2] <= time.time():
+            self._misses += 1
+            return None
+        
+        if row[1]:
+            self._negative_hits += 1
+        else:
+            self._hits += 1
+        return json.loads(row[0])
+    
+    async def set(self, location_string: str, result: Dict[str, Any]):
+        """
+        Store a geocoding outcome.
+        
+        Args:
+            location_string: Candidate location text
+            result: Location result; no coordinates means a negative entry
+        """
+        
+        negative = not (result.get("latitude") and result.get("longitude"))
+        expires_at = time.time() + (self.negative_ttl if negative else self.ttl)
+        
+        db = await self._get_db()
+        await db.execute("""
+            INSERT OR REPLACE INTO geocode_cache
+            (query, result, provider, confidence, negative, expires_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (
+            self.normalize(location_string),
+            json.dumps(result),
+            result.get("provider"),
+            result.get("confidence"),
+            int(negative),
+            expires_at
+        ))
+        await db.commit()
+        self._stores += 1
+    
+    async def _get_db(self) -> aiosqlite.Connection:
+        """Open the cache database on first use."""
+        
+        async with self._db_lock:
+            if self._db is None:
+                db = await aiosqlite.connect(self.db_path)
+                await db.execute("PRAGMA journal_mode=WAL")
+                await db.execute("""
+                    CREATE TABLE IF NOT EXISTS geocode_cache (
+                        query TEXT PRIMARY KEY,
+                        result TEXT NOT NULL,
+                        provider TEXT,
+                        confidence TEXT,
+                        negative INTEGER NOT NULL DEFAULT 0,
+                        expires_at REAL NOT NULL
+                    )
+                """)
+                await db.execute("DELETE FROM geocode_cache WHERE expires_at <= ?", (time.time(),))
+                await db.commit()
+                self._db = db
+        return self._db
+    
+    async def close(self):
+        """Close the cache database."""
+        
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Report hit/miss counters."""
+        
+        lookups = self._hits + self._negative_hits + self._misses
+        return {
+            "hits": self._hits,
+            "negative_hits": self._negative_hits,
+            "misses": self._misses,
+            "stores": self._stores,
+            "hit_ratio": round((self._hits + self._negative_hits) / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,154 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter.
+    
+    Waiters are served in arrival order, so requests scheduled first (the
+    highest-priority ones) get the first tokens.
+    """
+    
+    def __init__(self, rate: float, capacity: float = 1.0):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum burst size
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class GeocodeProvider:
+    """A geocoding backend and the rate limit bucket it draws from."""
+    
+    def __init__(self, name: str, geocode: Callable[[str], Awaitable[Optional[Dict[str, Any]]]], bucket: str):
+        """
+        Args:
+            name: Provider name used in logs and results
+            geocode: Coroutine returning a location result, or None for "no result"
+            bucket: Rate limit bucket; providers hitting the same service share one
+        """
+        self.name = name
+        self.geocode = geocode
+        self.bucket = bucket
+
+class GeocodeScheduler:
+    """
+    Concurrent, rate-limited geocoding across candidates and providers.
+    
+    Every (candidate, provider) pair is attempted concurrently, throttled by
+    per-service token buckets. Priority follows candidate order, then
+    provider order, so the answer is the same one a sequential scan would
+    return, but it arrives after roughly one round trip. As soon as the
+    best possible result is known, every remaining attempt is cancelled.
+    """
+    
+    def __init__(self, providers: List[GeocodeProvider], rate_limits: Dict[str, float], default_rate: float = 5.0):
+        """
+        Args:
+            providers: Providers in priority order
+            rate_limits: Requests per second by bucket name
+            default_rate: Rate for buckets missing from rate_limits
+        """
+        self.providers = providers
+        self.buckets = {
+            provider.bucket: TokenBucket(rate_limits.get(provider.bucket, default_rate))
+            for provider in providers
+        }
+        
+        self._attempts = 0
+        self._cancelled = 0
+        self._errors = 0
+    
+    async def resolve(self, candidates: List[str]) -> Tuple[Optional[Tuple[str, Dict[str, Any]]], List[str]]:
+        """
+        Geocode the highest-priority candidate that any provider can resolve.
+        
+        Args:
+            candidates: Candidate strings in priority order
+            
+        Returns:
+            Tuple of ((candidate, result) or None, candidates every provider
+            answered with "no result")
+        """
+        
+        if not candidates:
+            return None, []
+        
+        keys = [(ci, pi) for ci in range(len(candidates)) for pi in range(len(self.providers))]
+        # Tasks are created in priority order so they queue for tokens in that order too
+        tasks = {
+            asyncio.create_task(self._attempt(candidates[ci], self.providers[pi])): (ci, pi)
+            for ci, pi in keys
+        }
+        outcomes: Dict[Tuple[int, int], Any] = {}
+        winner = None
+        frontier = 0
+        
+        pending = set(tasks)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    outcomes[tasks[task]] = task.exception() or task.result()
+                
+                # Advance past finished failures; stop at the first unfinished or successful attempt
+                while frontier < len(keys) and keys[frontier] in outcomes:
+                    outcome = outcomes[keys[frontier]]
+                    if isinstance(outcome, dict):
+                        winner = keys[frontier]
+                        break
+                    frontier += 1
+        finally:
+            for task in pending:
+                task.cancel()
+            self._cancelled += len(pending)
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        negatives = [
+            candidate for ci, candidate in enumerate(candidates)
+            if all(outcomes.get((ci, pi), "pending") is None for pi in range(len(self.providers)))
+        ]
+        
+        if winner is None:
+            return None, negatives
+        return (candidates[winner[0]], outcomes[winner]), negatives
+    
+    async def _attempt(self, candidate: str, provider: GeocodeProvider) -> Optional[Dict[str, Any]]:
+        """Run one provider lookup once its bucket allows it."""
+        
+        await self.buckets[provider.bucket].acquire()
+        self._attempts += 1
+        try:
+            return await provider.geocode(candidate)
+        except Exception as e:
+            self._errors += 1
+            print(f"   ❌ {provider.name} error for '{candidate}': {str(e)}")
+            raise
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Report attempt, error and cancellation counts."""
+        
+        return {
+            "attempts": self._attempts,
+            "errors": self._errors,
+            "cancelled": self._cancelled,
+            "rate_limits": {name: bucket.rate for name, bucket in self.buckets.items()}
+        }
@@ -1,16 +1,23 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Query
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import tempfile
 import os
 from dotenv import load_dotenv
 import asyncio
-from typing import Optional
+import json
+import shutil
+import tempfile
+from typing import List, Optional
+from starlette.responses import JSONResponse, StreamingResponse
 
 from classification.classify import PollutionAnalyzerLLM
 from location.extractor import LocationExtractor
 from voice.voice_recognizer import VoiceRecognizer
 from LangChainHelper.langchain_helper import LangChainHelper
+from pipeline.analysis import AnalysisPipeline
+from pipeline.batch import BatchJobManager
+from pipeline.jobs import JobQueue
+from pipeline.streaming import StreamingSession
 
 # Load environment variables
 load_dotenv()
@@ -26,11 +33,86 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Upload size limits, enforced while the request body streams in
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(1024 * 1024 * 1024)))
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject upload requests larger than max_bytes without buffering them.
+    
+    Declared Content-Length is checked up front; otherwise received body
+    bytes are counted as they stream and the request is aborted with 413
+    as soon as the limit is crossed.
+    """
+    
+    def __init__(self, app, limits: tuple):
+        """
+        Args:
+            app: ASGI application
+            limits: (path prefix, max bytes) pairs, most specific prefix first
+        """
+        self.app = app
+        self.limits = limits
+    
+    async def __call__(self, scope, receive, send):
+        max_bytes = None
+        if scope["type"] == "http":
+            max_bytes = next((limit for prefix, limit in self.limits if scope["path"].startswith(prefix)), None)
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            response = JSONResponse(
+                {"detail": f"Upload exceeds maximum size of {max_bytes} bytes"},
+                status_code=413
+            )
+            await response(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds maximum size of {max_bytes} bytes")
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits=(("/analyze/batch", MAX_BATCH_UPLOAD_BYTES), ("/analyze", MAX_UPLOAD_BYTES))
+)
+
 # Initialize components
 voice_recognizer = VoiceRecognizer()
 pollution_analyzer = PollutionAnalyzerLLM()
 location_extractor = LocationExtractor()
 langchain_helper = LangChainHelper()
+analysis_pipeline = AnalysisPipeline(voice_recognizer, location_extractor, pollution_analyzer, langchain_helper)
+batch_manager = BatchJobManager(
+    analysis_pipeline,
+    concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", "4")),
+    max_jobs=int(os.getenv("BATCH_MAX_JOBS", "100")),
+    work_root=os.getenv("BATCH_WORK_DIR") or None,
+    max_extracted_bytes=MAX_BATCH_UPLOAD_BYTES,
+    max_archive_members=int(os.getenv("BATCH_MAX_ARCHIVE_MEMBERS", "1000"))
+)
+job_queue = JobQueue(
+    analysis_pipeline,
+    db_path=os.getenv("JOB_QUEUE_DB", "./jobs.db"),
+    work_dir=os.getenv("JOB_WORK_DIR", "./job_audio"),
+    workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "3")),
+    retry_delay=float(os.getenv("JOB_RETRY_DELAY", "5"))
+)
 
 class AnalysisResponse(BaseModel):
     transcription: str
@@ -40,14 +122,19 @@ class AnalysisResponse(BaseModel):
     recommendation: str
     responsible_agency: str
     raw_cohere_response: dict
+    metadata: dict = {}
 
 class QueryResponse(BaseModel):
     query: str
     sql_query: str
     result: list
+    next_cursor: Optional[str] = None
 
 @app.post("/analyze", response_model=AnalysisResponse)
-async def analyze_audio(file: UploadFile = File(...)):
+async def analyze_audio(
+    file: UploadFile = File(...),
+    run_async: bool = Query(False, alias="async", description="Queue the analysis and return a job ID")
+):
     """
     Analyze uploaded audio file for pollution reporting.
     
@@ -57,75 +144,247 @@ async def analyze_audio(file: UploadFile = File(...)):
     - Pollution type classification
     - Cleanup recommendations
     - Responsible agency identification
+    
+    With async=true the file is queued and a job ID is returned immediately;
+    poll /jobs/{job_id} for the result.
     """
     
     # Validate file type
     if not file.filename.endswith('.wav'):
         raise HTTPException(status_code=400, detail="Only .wav files are supported")
     
-    # Create temporary file for audio processing
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
+    if run_async:
         try:
-            # Save uploaded file to temporary location
-            content = await file.read()
-            temp_file.write(content)
-            temp_file.flush()
-            
-            # Step 1: Transcribe audio to text
-            transcription = await voice_recognizer.transcribe(temp_file.name)
-            recognition_service = voice_recognizer.get_service_name()
-            
-            # Step 2: Extract location information from transcription
-            location_info = await location_extractor.extract_location(transcription)
-            
-            # Step 3: Analyze pollution type and generate recommendations
-            pollution_analysis = await pollution_analyzer.analyze(transcription)
-            
-            # Step 4: Assemble response data
-            analysis_data = {
-                "transcription": transcription,
-                "recognition_service": recognition_service,
-                "location": location_info,
-                "pollution_type": pollution_analysis["pollution_type"],
-                "recommendation": pollution_analysis["recommendation"],
-                "responsible_agency": pollution_analysis["responsible_agency"],
-                "raw_cohere_response": pollution_analysis["raw_response"]
-            }
-            
-            # Step 5: Store data in database
-            await langchain_helper.add_to_db(analysis_data)
-            
-            return AnalysisResponse(**analysis_data)
-            
+            await file.seek(0)
+            job = await job_queue.submit(file.file, file.filename)
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to queue analysis: {str(e)}")
+        return JSONResponse(job, status_code=202)
+    
+    try:
+        # The multipart parser has already streamed the upload into a spooled
+        # buffer (memory, spilling to disk), so hand that buffer straight to
+        # the pipeline instead of reading it into RAM and re-writing it
+        await file.seek(0)
+        analysis_data = await analysis_pipeline.run(file.file, os.path.splitext(file.filename)[1])
+        
+        return AnalysisResponse(**analysis_data)
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def analysis_events(audio, file_ext: str):
+    """
+    Run the pipeline and yield an SSE message as each stage completes.
+    
+    If the client disconnects, the generator is cancelled and takes the
+    running pipeline down with it.
+    """
+    
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def on_stage(name: str, value, timing: dict):
+        if name == "transcription":
+            payload = {"text": value["text"], "service": value["service"]}
+        elif name == "location":
+            payload = {"location": value}
+        elif name == "classification":
+            payload = {key: item for key, item in value.items() if key != "raw_response"}
+        else:
+            # The persist stage only queues the record; "persisted" follows the write
+            return
+        events.put_nowait((name, {**payload, "timing": timing}))
+    
+    async def run():
+        try:
+            analysis_data = await analysis_pipeline.run(audio, file_ext, wait_for_persist=True, on_stage=on_stage)
+            events.put_nowait(("persisted", {"record_id": analysis_data.get("record_id")}))
+            events.put_nowait(("complete", AnalysisResponse(**analysis_data).model_dump()))
+        except Exception as e:
+            events.put_nowait(("error", {"detail": f"Analysis failed: {str(e)}"}))
+        events.put_nowait(None)
+    
+    task = asyncio.create_task(run())
+    try:
+        while (item := await events.get()) is not None:
+            yield format_sse(*item)
+    finally:
+        if not task.done():
+            print("Client disconnected, cancelling analysis")
+            task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        audio.close()
+
+@app.post("/analyze/events")
+async def analyze_audio_events(file: UploadFile = File(...)):
+    """
+    Analyze an uploaded .wav file, streaming progress as Server-Sent Events.
+    
+    Emits transcription, location and classification events as each stage
+    completes, then persisted (with the record ID) and complete (the same
+    body /analyze returns). An error event ends the stream on failure.
+    """
+    
+    if not file.filename.endswith('.wav'):
+        raise HTTPException(status_code=400, detail="Only .wav files are supported")
+    
+    # The upload is closed when this handler returns, before the stream is read
+    audio = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    await file.seek(0)
+    await asyncio.to_thread(shutil.copyfileobj, file.file, audio)
+    audio.seek(0)
+    
+    return StreamingResponse(
+        analysis_events(audio, os.path.splitext(file.filename)[1]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/analyze/stream")
+async def analyze_stream(websocket: WebSocket, sample_rate: int = 16000, sample_width: int = 2):
+    """
+    Analyze audio while it is being recorded.
+    
+    The client sends raw mono PCM (sample_rate Hz, sample_width bytes per
+    sample) as binary messages and {"event": "end"} when recording stops.
+    The server replies with "partial" events as segments are transcribed,
+    "analysis" events as early location/classification results arrive,
+    and a final "result" event holding the full analysis.
+    """
+    
+    await websocket.accept()
+    session = StreamingSession(
+        analysis_pipeline,
+        voice_recognizer,
+        websocket.send_json,
+        sample_rate=sample_rate,
+        sample_width=sample_width,
+        min_words=int(os.getenv("STREAM_MIN_WORDS", "8")),
+        max_seconds=float(os.getenv("STREAM_MAX_SECONDS", "600"))
+    )
+    
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                await session.feed(message["bytes"])
+            elif message.get("text") and json.loads(message["text"]).get("event") == "end":
+                break
         
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file.name):
-                os.unlink(temp_file.name)
+        analysis_data = await session.finish()
+        await websocket.send_json({
+            "event": "result",
+            "record_id": analysis_data.get("record_id"),
+            "result": AnalysisResponse(**analysis_data).model_dump()
+        })
+        await websocket.close()
+        
+    except WebSocketDisconnect:
+        await session.cancel()
+    except Exception as e:
+        await session.cancel()
+        await websocket.send_json({"event": "error", "detail": f"Analysis failed: {str(e)}"})
+        await websocket.close(code=1011)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Report the status of a queued analysis job, with its result once completed."""
+    
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/analyze/batch")
+async def analyze_batch(files: List[UploadFile] = File(...)):
+    """
+    Queue many audio files for analysis in one request.
+    
+    Accepts .wav files and .zip archives of .wav files. Returns a job ID
+    immediately; poll /analyze/batch/{job_id} for progress and results.
+    """
+    
+    for file in files:
+        if not file.filename.lower().endswith(('.wav', '.zip')):
+            raise HTTPException(status_code=400, detail=f"Unsupported file type: {file.filename}")
+    
+    # Uploads are closed once this response is sent, so move them into the job's directory
+    work_dir = batch_manager.create_work_dir()
+    stored = []
+    try:
+        for index, file in enumerate(files):
+            path = os.path.join(work_dir, f"{index}{os.path.splitext(file.filename)[1].lower()}")
+            await file.seek(0)
+            with open(path, "wb") as target:
+                await asyncio.to_thread(shutil.copyfileobj, file.file, target)
+            stored.append({"filename": file.filename, "path": path})
+    except Exception as e:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Failed to store batch upload: {str(e)}")
+    
+    job = batch_manager.submit(work_dir, stored)
+    return job.to_dict(include_results=False)
+
+@app.get("/analyze/batch/{job_id}")
+async def batch_status(job_id: str, include_results: bool = True):
+    """Report progress and per-file results of a batch job."""
+    
+    job = batch_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job.to_dict(include_results=include_results)
 
 @app.get("/ask", response_model=QueryResponse)
-async def ask_question(q: str = Query(..., description="Natural language question to query the database")):
+async def ask_question(
+    q: str = Query(..., description="Natural language question to query the database"),
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return for listed records"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size for listed records"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
     """
     Ask natural language questions about stored pollution data.
     
     Converts natural language queries to SQL and returns results from the database.
+    Listed records are paged newest first; follow next_cursor for older ones.
     """
     
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
     try:
         # Convert natural language to SQL and execute query
-        sql_query, result = await langchain_helper.query(q)
+        sql_query, result, next_cursor = await langchain_helper.query(q, field_list, limit, cursor)
         
         return QueryResponse(
             query=q,
             sql_query=sql_query,
-            result=result
+            result=result,
+            next_cursor=next_cursor
         )
         
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
+@app.get("/records/{record_id}/raw_response")
+async def record_raw_response(record_id: int):
+    """Audit payload of the LLM call behind a stored record."""
+    
+    raw_response = await langchain_helper.get_raw_response(record_id)
+    if raw_response is None:
+        raise HTTPException(status_code=404, detail="Raw response not found")
+    return raw_response
+
+@app.get("/stats")
+async def stats():
+    """Record counts by type and severity, located records and recent activity."""
+    return langchain_helper.get_live_statistics()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring service status."""
@@ -135,10 +394,40 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Runtime metrics for capacity monitoring."""
+    return {
+        "database_pool": langchain_helper.get_pool_stats(),
+        "write_buffer": langchain_helper.write_buffer.get_stats(),
+        "query_cache": langchain_helper.query_cache.get_stats() if langchain_helper.query_cache_enabled else {"enabled": False},
+        "raw_responses": langchain_helper.raw_codec.get_stats(),
+        "recognition": voice_recognizer.get_metrics(),
+        "classifier": pollution_analyzer.get_metrics(),
+        "geocoding": location_extractor.get_metrics(),
+        "job_queue": job_queue.get_stats()
+    }
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and other startup tasks."""
     await langchain_helper.initialize_db()
+    if pollution_analyzer.fast_path_enabled:
+        records = await langchain_helper.get_training_records(int(os.getenv("FAST_PATH_TRAINING_LIMIT", "5000")))
+        trained = pollution_analyzer.train_fast_path(records)
+        print(f"⚡ Fast-path classifier trained on {trained} stored records")
+    await voice_recognizer.start()
+    await job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled resources on shutdown."""
+    await job_queue.close()
+    await batch_manager.close()
+    await langchain_helper.close()
+    await pollution_analyzer.close()
+    await location_extractor.close()
+    await voice_recognizer.close()
 
 if __name__ == "__main__":
     import uvicorn
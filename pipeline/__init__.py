@@ -0,0 +1 @@
+# Analysis pipeline module
\ No newline at end of file
@@ -0,0 +1,184 @@
+import asyncio
+import os
+from typing import Any, BinaryIO, Callable, Dict, Optional, Union
+
+from .executor import PipelineExecutor, Stage
+
+class AnalysisPipeline:
+    """
+    Stage graph for analyzing a single audio report.
+    
+    transcription ─┬─> location ───────┬─> persist
+                   └─> classification ─┘
+    
+    Location extraction and classification only need the transcription,
+    so they run concurrently and the request costs max(geocode, LLM)
+    rather than their sum.
+    """
+    
+    def __init__(self, voice_recognizer, location_extractor, pollution_analyzer, db_helper):
+        """
+        Wire pipeline stages to the application components.
+        
+        Args:
+            voice_recognizer: VoiceRecognizer instance
+            location_extractor: LocationExtractor instance
+            pollution_analyzer: PollutionAnalyzerLLM instance
+            db_helper: LangChainHelper instance
+        """
+        self.voice_recognizer = voice_recognizer
+        self.location_extractor = location_extractor
+        self.pollution_analyzer = pollution_analyzer
+        self.db_helper = db_helper
+        
+        # Per-stage timeouts in seconds
+        self.timeouts = {
+            "transcription": float(os.getenv("PIPELINE_TRANSCRIPTION_TIMEOUT", "60")),
+            "location": float(os.getenv("PIPELINE_LOCATION_TIMEOUT", "30")),
+            "classification": float(os.getenv("PIPELINE_CLASSIFICATION_TIMEOUT", "45")),
+            "persist": float(os.getenv("PIPELINE_PERSIST_TIMEOUT", "10"))
+        }
+        
+        self.executor = PipelineExecutor([
+            Stage("transcription", self._transcribe, timeout=self.timeouts["transcription"]),
+            Stage(
+                "location", self._extract_location,
+                depends_on=["transcription"],
+                timeout=self.timeouts["location"],
+                required=False,
+                fallback=self._location_fallback
+            ),
+            Stage(
+                "classification", self._classify,
+                depends_on=["transcription"],
+                timeout=self.timeouts["classification"]
+            ),
+            Stage(
+                "persist", self._persist,
+                depends_on=["location", "classification"],
+                timeout=self.timeouts["persist"]
+            )
+        ])
+        
+        # Text-only stages for transcripts produced elsewhere (e.g. live streams)
+        self.text_executor = PipelineExecutor([
+            Stage(
+                "location", self._extract_location,
+                timeout=self.timeouts["location"],
+                required=False,
+                fallback=self._location_fallback
+            ),
+            Stage("classification", self._classify, timeout=self.timeouts["classification"])
+        ])
+    
+    async def run(
+        self,
+        audio_source: Union[str, BinaryIO],
+        file_ext: Optional[str] = None,
+        wait_for_persist: bool = False,
+        on_stage: Optional[Callable[[str, Any, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the full analysis for one audio file.
+        
+        Args:
+            audio_source: Path to the audio file, or the upload's binary file object
+            file_ext: Audio format extension when audio_source is a file object
+            wait_for_persist: Wait for the batched insert and include its record_id
+            on_stage: Progress callback, see PipelineExecutor.run
+            
+        Returns:
+            Analysis data including per-stage timing metadata
+        """
+        
+        results, timings = await self.executor.run({"audio_source": audio_source, "file_ext": file_ext}, on_stage)
+        
+        analysis_data = self._assemble(results)
+        analysis_data["metadata"] = {"timings": timings, "audio": results["transcription"].get("audio", {})}
+        if wait_for_persist:
+            analysis_data["record_id"] = await results["persist"]
+        return analysis_data
+    
+    async def analyze_text(self, text: str) -> Dict[str, Any]:
+        """
+        Run location extraction and classification on a transcript.
+        
+        Returns:
+            Dictionary with "location", "classification" and "timings"
+        """
+        
+        results, timings = await self.text_executor.run({"transcription": {"text": text}})
+        return {"location": results["location"], "classification": results["classification"], "timings": timings}
+    
+    async def finalize(
+        self,
+        transcription: Dict[str, Any],
+        analysis: Optional[Dict[str, Any]] = None,
+        wait_for_persist: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Complete and persist an analysis for an existing transcription.
+        
+        Args:
+            transcription: Dictionary with "text", "service" and optional "audio" stats
+            analysis: Result of analyze_text for the same text, or None to run it now
+            wait_for_persist: Wait for the batched insert and include its record_id
+            
+        Returns:
+            Analysis data in the same shape as run()
+        """
+        
+        if analysis is None:
+            analysis = await self.analyze_text(transcription["text"])
+        
+        results = {
+            "transcription": transcription,
+            "location": analysis["location"],
+            "classification": analysis["classification"]
+        }
+        record_future = await self._persist(results)
+        
+        analysis_data = self._assemble(results)
+        analysis_data["metadata"] = {"timings": analysis["timings"], "audio": transcription.get("audio", {})}
+        if wait_for_persist:
+            analysis_data["record_id"] = await record_future
+        return analysis_data
+    
+    async def _transcribe(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        transcription = await self.voice_recognizer.transcribe_with_metadata(results["audio_source"], results["file_ext"])
+        return {"text": transcription["text"], "service": transcription["service"], "audio": transcription["audio"]}
+    
+    async def _extract_location(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.location_extractor.extract_location(results["transcription"]["text"])
+    
+    def _location_fallback(self, results: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        return {
+            "latitude": None,
+            "longitude": None,
+            "address": None,
+            "confidence": "timeout" if isinstance(error, asyncio.TimeoutError) else "error"
+        }
+    
+    async def _classify(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.pollution_analyzer.analyze(results["transcription"]["text"])
+    
+    async def _persist(self, results: Dict[str, Any]) -> asyncio.Future:
+        # Write-behind: the record is flushed in a later batch; the future yields its ID
+        return await self.db_helper.enqueue_record(self._assemble(results))
+    
+    def _assemble(self, results: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the record/response dictionary from stage results."""
+        
+        pollution_analysis = results["classification"]
+        return {
+            "transcription": results["transcription"]["text"],
+            "recognition_service": results["transcription"]["service"],
+            "location": results["location"],
+            "pollution_type": pollution_analysis["pollution_type"],
+            "recommendation": pollution_analysis["recommendation"],
+            "responsible_agency": pollution_analysis["responsible_agency"],
+            "severity_level": pollution_analysis.get("severity_level", "medium"),
+            "immediate_actions": pollution_analysis.get("immediate_actions", ""),
+            "long_term_solution": pollution_analysis.get("long_term_solution", ""),
+            "raw_cohere_response": pollution_analysis.get("raw_response", {})
+        }
@@ -0,0 +1,223 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+class BatchJob:
+    """Progress and per-file results of one batch analysis job."""
+    
+    def __init__(self, job_id: str, work_dir: str, files: List[Dict[str, str]]):
+        self.job_id = job_id
+        self.work_dir = work_dir
+        self.files = files
+        self.status = "queued"
+        self.results: List[Dict[str, Any]] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+    
+    def to_dict(self, include_results: bool = True) -> Dict[str, Any]:
+        """Summarize job status and progress."""
+        
+        succeeded = sum(1 for result in self.results if result["status"] == "completed")
+        processed = len(self.results)
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        
+        summary = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": len(self.files),
+            "processed": processed,
+            "succeeded": succeeded,
+            "failed": processed - succeeded,
+            "progress": round(processed / len(self.files), 3) if self.files else 1.0,
+            "elapsed_seconds": round(elapsed, 2),
+            "files_per_second": round(processed / elapsed, 3) if elapsed else 0.0
+        }
+        if self.error:
+            summary["error"] = self.error
+        if include_results:
+            summary["results"] = self.results
+        return summary
+
+class BatchJobManager:
+    """
+    Runs the analysis pipeline over many audio files in the background.
+    
+    Uploaded files are stored in a per-job working directory and processed
+    with bounded concurrency. Records go through the shared write-behind
+    buffer, so concurrent files land in the database as bulk inserts.
+    Jobs are tracked in memory; the most recent max_jobs are kept.
+    """
+    
+    def __init__(self, pipeline, concurrency: int = 4, max_jobs: int = 100, work_root: Optional[str] = None,
+                 max_extracted_bytes: int = 1024 * 1024 * 1024, max_archive_members: int = 1000):
+        """
+        Args:
+            pipeline: AnalysisPipeline used for every file
+            concurrency: Files analyzed at the same time per job
+            max_jobs: Finished jobs kept for status queries
+            work_root: Directory for uploaded batch files (system temp by default)
+            max_extracted_bytes: Total uncompressed size allowed from a job's archives
+            max_archive_members: Total audio files allowed from a job's archives
+        """
+        self.pipeline = pipeline
+        self.concurrency = max(1, concurrency)
+        self.max_jobs = max_jobs
+        self.work_root = work_root or tempfile.gettempdir()
+        self.max_extracted_bytes = max_extracted_bytes
+        self.max_archive_members = max_archive_members
+        self.jobs: "OrderedDict[str, BatchJob]" = OrderedDict()
+    
+    def create_work_dir(self) -> str:
+        """Create a working directory for a new job's files."""
+        return tempfile.mkdtemp(prefix="batch_", dir=self.work_root)
+    
+    def submit(self, work_dir: str, files: List[Dict[str, str]]) -> BatchJob:
+        """
+        Start a batch job.
+        
+        Args:
+            work_dir: Directory holding the job's files, removed when the job ends
+            files: List of {"filename": original name, "path": stored path}
+            
+        Returns:
+            The created job
+        """
+        
+        job = BatchJob(uuid.uuid4().hex, work_dir, files)
+        self.jobs[job.job_id] = job
+        self._prune()
+        job.task = asyncio.create_task(self._run(job))
+        return job
+    
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        return self.jobs.get(job_id)
+    
+    async def close(self):
+        """Cancel running jobs and remove their files."""
+        
+        tasks = [job.task for job in self.jobs.values() if job.task and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    async def _run(self, job: BatchJob):
+        """Analyze every file of a job with bounded concurrency."""
+        
+        job.status = "running"
+        job.started_at = time.time()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def analyze_file(item: Dict[str, str]):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    analysis = await self.pipeline.run(item["path"], wait_for_persist=True)
+                    job.results.append({
+                        "filename": item["filename"],
+                        "status": "completed",
+                        "record_id": analysis.get("record_id"),
+                        "transcription": analysis["transcription"],
+                        "pollution_type": analysis["pollution_type"],
+                        "location": analysis["location"],
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+                    })
+                except Exception as e:
+                    job.results.append({
+                        "filename": item["filename"],
+                        "status": "failed",
+                        "error": str(e)
+                    })
+                finally:
+                    if os.path.exists(item["path"]):
+                        os.unlink(item["path"])
+        
+        try:
+            job.files = await asyncio.to_thread(self._expand_archives, job.files)
+            await asyncio.gather(*(analyze_file(item) for item in job.files))
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+            print(f"Batch job {job.job_id} {job.status}: {len(job.results)}/{len(job.files)} files")
+    
+    def _expand_archives(self, files: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Replace uploaded .zip archives with the .wav files they contain.
+        
+        Raises:
+            ValueError: If the archives hold more audio files or more
+                uncompressed bytes than the job limits allow
+        """
+        
+        expanded = []
+        remaining_bytes = self.max_extracted_bytes
+        remaining_members = self.max_archive_members
+        for item in files:
+            if not item["filename"].lower().endswith(".zip"):
+                expanded.append(item)
+                continue
+            
+            with zipfile.ZipFile(item["path"]) as archive:
+                members = [
+                    member for member in archive.infolist()
+                    if not member.is_dir() and member.filename.lower().endswith(".wav")
+                ]
+                # Reject on the declared sizes before anything touches the disk
+                remaining_members -= len(members)
+                if remaining_members < 0:
+                    raise ValueError(f"Archives contain more than {self.max_archive_members} audio files")
+                if sum(member.file_size for member in members) > remaining_bytes:
+                    raise ValueError(f"Archives expand to more than {self.max_extracted_bytes} bytes")
+                
+                for index, member in enumerate(members):
+                    # Never trust archive paths; store under a generated flat name
+                    path = os.path.join(os.path.dirname(item["path"]), f"{len(expanded)}_{index}.wav")
+                    remaining_bytes -= self._extract_member(archive, member, path, remaining_bytes)
+                    expanded.append({"filename": f"{item['filename']}/{member.filename}", "path": path})
+            os.unlink(item["path"])
+        return expanded
+    
+    def _extract_member(self, archive: zipfile.ZipFile, member: zipfile.ZipInfo, path: str, limit: int) -> int:
+        """
+        Copy one archive member to disk, stopping once it exceeds limit bytes.
+        
+        Declared sizes can be forged, so the bytes actually written are counted.
+        
+        Returns:
+            Bytes written
+        """
+        
+        written = 0
+        with archive.open(member) as source, open(path, "wb") as target:
+            while True:
+                chunk = source.read(1024 * 1024)
+                if not chunk:
+                    return written
+                written += len(chunk)
+                if written > limit:
+                    raise ValueError(f"Archives expand to more than {self.max_extracted_bytes} bytes")
+                target.write(chunk)
+    
+    def _prune(self):
+        """Forget the oldest finished jobs beyond max_jobs."""
+        
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].status not in ("queued", "running"):
+                del self.jobs[job_id]
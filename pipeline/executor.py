@@ -0,0 +1,152 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+class StageError(RuntimeError):
+    """Raised when a required pipeline stage fails or times out."""
+    
+    def __init__(self, stage_name: str, message: str):
+        super().__init__(f"Stage '{stage_name}' {message}")
+        self.stage_name = stage_name
+
+class Stage:
+    """
+    A single step of a pipeline.
+    
+    The stage function receives the shared results dictionary, which holds
+    the pipeline inputs plus the return value of every finished stage keyed
+    by stage name.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Awaitable[Any]],
+        depends_on: Iterable[str] = (),
+        timeout: Optional[float] = None,
+        required: bool = True,
+        fallback: Optional[Callable[[Dict[str, Any], Exception], Any]] = None
+    ):
+        """
+        Define a pipeline stage.
+        
+        Args:
+            name: Unique stage name, also the key of its result
+            func: Coroutine function taking the results dictionary
+            depends_on: Names of stages that must finish first
+            timeout: Seconds before the stage is cancelled (None for no limit)
+            required: Whether a failure aborts the whole pipeline
+            fallback: For optional stages, builds the result used on failure
+        """
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.required = required
+        self.fallback = fallback
+
+class PipelineExecutor:
+    """
+    Runs a DAG of async stages with maximum concurrency.
+    
+    Every stage starts as soon as all of its dependencies have finished, so
+    independent stages overlap and the end-to-end latency follows the
+    critical path rather than the sum of all stages. A failing required
+    stage cancels everything still running.
+    """
+    
+    def __init__(self, stages: Iterable[Stage]):
+        """
+        Validate and store the stage graph.
+        
+        Args:
+            stages: Stages in dependency order (dependencies listed before dependents)
+        """
+        self.stages = list(stages)
+        
+        seen = set()
+        for stage in self.stages:
+            if stage.name in seen:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            missing = [dep for dep in stage.depends_on if dep not in seen]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown or later stages: {missing}")
+            seen.add(stage.name)
+    
+    async def run(
+        self,
+        inputs: Optional[Dict[str, Any]] = None,
+        on_stage: Optional[Callable[[str, Any, Dict[str, Any]], None]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Execute all stages.
+        
+        Args:
+            inputs: Initial values made available to every stage
+            on_stage: Called with (stage name, result, timing) as each stage
+                completes, including optional stages that fell back
+            
+        Returns:
+            Tuple of (results by stage name, timing metadata)
+            
+        Raises:
+            StageError: If a required stage fails or times out
+        """
+        
+        results: Dict[str, Any] = dict(inputs or {})
+        stage_timings: Dict[str, Dict[str, Any]] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        started = time.perf_counter()
+        
+        async def run_stage(stage: Stage) -> Any:
+            if stage.depends_on:
+                await asyncio.gather(*(tasks[dep] for dep in stage.depends_on))
+            
+            stage_started = time.perf_counter()
+            status = "ok"
+            try:
+                value = await asyncio.wait_for(stage.func(results), timeout=stage.timeout)
+            except asyncio.TimeoutError as e:
+                status = "timeout"
+                value = self._handle_failure(stage, results, e, f"timed out after {stage.timeout}s")
+            except Exception as e:
+                status = "error"
+                value = self._handle_failure(stage, results, e, f"failed: {str(e)}")
+            finally:
+                stage_timings[stage.name] = {
+                    "start_ms": round((stage_started - started) * 1000, 2),
+                    "duration_ms": round((time.perf_counter() - stage_started) * 1000, 2),
+                    "status": status
+                }
+            
+            results[stage.name] = value
+            if on_stage is not None:
+                on_stage(stage.name, value, stage_timings[stage.name])
+            return value
+        
+        for stage in self.stages:
+            tasks[stage.name] = asyncio.create_task(run_stage(stage))
+        
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            # Cancel whatever is still running, including on client disconnect
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        
+        timings = {
+            "total_ms": round((time.perf_counter() - started) * 1000, 2),
+            "stages": stage_timings
+        }
+        return results, timings
+    
+    def _handle_failure(self, stage: Stage, results: Dict[str, Any], error: Exception, message: str) -> Any:
+        """Substitute the fallback for an optional stage, or abort the pipeline."""
+        
+        if stage.required or stage.fallback is None:
+            raise StageError(stage.name, message) from error
+        
+        print(f"⚠️ Optional stage '{stage.name}' {message}, using fallback")
+        return stage.fallback(results, error)
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, List, Optional
+
+import aiosqlite
+
+from LangChainHelper.write_buffer import WriteBufferError
+from .executor import StageError
+
+class JobQueue:
+    """
+    Persistent queue of analysis jobs served by an in-process worker pool.
+    
+    Jobs and their audio live on disk (a SQLite table plus one file per
+    job), so queued work survives a restart: jobs that were running when
+    the process stopped are put back in the queue on start(). Failures
+    caused by timeouts, connection problems or the database write are
+    retried with a growing delay; anything else fails the job at once.
+    """
+    
+    def __init__(
+        self,
+        pipeline,
+        db_path: str,
+        work_dir: str,
+        workers: int = 2,
+        max_attempts: int = 3,
+        retry_delay: float = 5.0,
+        poll_interval: float = 1.0
+    ):
+        """
+        Initialize queue settings. Workers are started in start().
+        
+        Args:
+            pipeline: AnalysisPipeline that runs each job
+            db_path: SQLite file holding the job table
+            work_dir: Directory where queued audio files are kept
+            workers: Number of concurrent worker tasks
+            max_attempts: Attempts per job before it is marked failed
+            retry_delay: Base seconds before a retry, multiplied by the attempt number
+            poll_interval: Seconds an idle worker waits before checking for due retries
+        """
+        self.pipeline = pipeline
+        self.db_path = db_path
+        self.work_dir = work_dir
+        self.workers = max(1, workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        
+        self._db: Optional[aiosqlite.Connection] = None
+        self._claim_lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._retries = 0
+        self._busy = 0
+    
+    async def start(self):
+        """Open the job table, requeue interrupted jobs and start the workers."""
+        
+        os.makedirs(self.work_dir, exist_ok=True)
+        self._db = await aiosqlite.connect(self.db_path)
+        self._db.row_factory = aiosqlite.Row
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                filename TEXT,
+                audio_path TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                result TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                available_at REAL NOT NULL
+            )
+        """)
+        await self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_jobs_queue ON analysis_jobs (status, available_at)"
+        )
+        cursor = await self._db.execute(
+            "UPDATE analysis_jobs SET status = 'queued', updated_at = ? WHERE status = 'running'",
+            (time.time(),)
+        )
+        if cursor.rowcount:
+            print(f"Requeued {cursor.rowcount} interrupted analysis jobs")
+        await self._db.commit()
+        
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    async def close(self):
+        """Stop the workers and close the job table. Unfinished jobs resume on the next start()."""
+        
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+    
+    async def submit(self, audio_file: BinaryIO, filename: str) -> Dict[str, Any]:
+        """
+        Store an audio file and queue it for analysis.
+        
+        Args:
+            audio_file: Binary file object positioned at the start of the audio
+            filename: Original file name, used for the stored file's extension
+        
+        Returns:
+            The queued job
+        """
+        
+        if self._db is None:
+            raise RuntimeError("Job queue is not running")
+        
+        job_id = uuid.uuid4().hex
+        audio_path = os.path.join(self.work_dir, f"{job_id}{os.path.splitext(filename)[1].lower()}")
+        
+        def store():
+            with open(audio_path, "wb") as target:
+                shutil.copyfileobj(audio_file, target)
+        
+        await asyncio.to_thread(store)
+        
+        now = time.time()
+        await self._db.execute("""
+            INSERT INTO analysis_jobs
+            (id, status, filename, audio_path, attempts, created_at, updated_at, available_at)
+            VALUES (?, 'queued', ?, ?, 0, ?, ?, ?)
+        """, (job_id, filename, audio_path, now, now, now))
+        await self._db.commit()
+        
+        self._submitted += 1
+        self._wakeup.set()
+        return await self.get(job_id)
+    
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a job.
+        
+        Returns:
+            Job status, attempts, error and (once completed) the analysis result, or None
+        """
+        
+        cursor = await self._db.execute("SELECT * FROM analysis_jobs WHERE id = ?", (job_id,))
+        row = await cursor.fetchone()
+        if row is None:
+            return None
+        
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "attempts": row["attempts"],
+            "error": row["error"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
+    
+    async def _claim(self) -> Optional[aiosqlite.Row]:
+        """Mark the oldest due job as running and return it."""
+        
+        async with self._claim_lock:
+            now = time.time()
+            cursor = await self._db.execute("""
+                SELECT id, audio_path, attempts FROM analysis_jobs
+                WHERE status = 'queued' AND available_at <= ?
+                ORDER BY created_at
+                LIMIT 1
+            """, (now,))
+            row = await cursor.fetchone()
+            if row is None:
+                return None
+            
+            await self._db.execute(
+                "UPDATE analysis_jobs SET status = 'running', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (now, row["id"])
+            )
+            await self._db.commit()
+            return row
+    
+    async def _worker(self):
+        """Process jobs until cancelled."""
+        
+        while True:
+            job = await self._claim()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            self._busy += 1
+            attempt = job["attempts"] + 1
+            try:
+                await self._process(job["id"], job["audio_path"], attempt)
+            except Exception as e:
+                # Keep the worker alive and never leave the job stuck as running
+                print(f"❌ Job worker error on {job['id']}: {str(e)}")
+                await self._recover(job["id"], job["audio_path"], attempt, e)
+            finally:
+                self._busy -= 1
+    
+    async def _recover(self, job_id: str, audio_path: str, attempt: int, error: Exception):
+        """Requeue or fail a job whose outcome could not be recorded."""
+        
+        try:
+            if attempt < self.max_attempts:
+                self._retries += 1
+                await self._update(job_id, "queued", error=str(error),
+                                   available_at=time.time() + self.retry_delay * attempt)
+            else:
+                self._failed += 1
+                await self._update(job_id, "failed", error=str(error))
+                self._remove_audio(audio_path)
+        except Exception as e:
+            # The job table itself is failing; the job is requeued on the next start()
+            print(f"❌ Could not record the outcome of job {job_id}: {str(e)}")
+    
+    async def _process(self, job_id: str, audio_path: str, attempt: int):
+        """Run one attempt of a job and record the outcome."""
+        
+        try:
+            analysis_data = await self.pipeline.run(audio_path, wait_for_persist=True)
+        except Exception as e:
+            if self._is_transient(e) and attempt < self.max_attempts:
+                self._retries += 1
+                delay = self.retry_delay * attempt
+                print(f"⚠️ Job {job_id} attempt {attempt} failed, retrying in {delay}s: {str(e)}")
+                await self._update(job_id, "queued", error=str(e), available_at=time.time() + delay)
+                return
+            
+            print(f"❌ Job {job_id} failed after {attempt} attempts: {str(e)}")
+            await self._update(job_id, "failed", error=str(e))
+            self._failed += 1
+            self._remove_audio(audio_path)
+            return
+        
+        await self._update(job_id, "completed", result=json.dumps(analysis_data, default=str))
+        self._completed += 1
+        self._remove_audio(audio_path)
+    
+    async def _update(self, job_id: str, status: str, error: Optional[str] = None,
+                      result: Optional[str] = None, available_at: Optional[float] = None):
+        """Write a job's new status."""
+        
+        now = time.time()
+        await self._db.execute("""
+            UPDATE analysis_jobs
+            SET status = ?, error = ?, result = ?, updated_at = ?, available_at = ?
+            WHERE id = ?
+        """, (status, error, result, now, available_at or now, job_id))
+        await self._db.commit()
+    
+    def _is_transient(self, error: Exception) -> bool:
+        """Whether a failed attempt is worth retrying."""
+        
+        # Stage failures wrap the original exception as their cause
+        cause = error.__cause__ if isinstance(error, StageError) else error
+        if isinstance(error, StageError) and error.stage_name == "persist":
+            return True
+        # The batched insert is awaited after the stages, outside any StageError
+        return isinstance(cause, (asyncio.TimeoutError, ConnectionError, WriteBufferError))
+    
+    def _remove_audio(self, audio_path: str):
+        if os.path.exists(audio_path):
+            os.unlink(audio_path)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Report worker usage and job outcome counters."""
+        
+        return {
+            "workers": len(self._tasks),
+            "busy_workers": self._busy,
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "failed": self._failed,
+            "retries": self._retries,
+            "max_attempts": self.max_attempts
+        }
@@ -0,0 +1,231 @@
+import asyncio
+import audioop
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from voice.segmentation import find_speech_segments
+
+class StreamingSession:
+    """
+    Incremental analysis of audio streamed while it is being recorded.
+    
+    Incoming PCM is normalized to the recognizer's format and buffered.
+    Whenever the speaker pauses, the speech before the pause is cut off
+    as a segment and transcribed in the background, and a partial
+    transcript is sent to the client. Once the transcript holds enough
+    words, location extraction and classification run on it
+    speculatively and are repeated as more text arrives, so by the time
+    the stream ends only the last segment and, if the text changed, one
+    more analysis pass remain.
+    """
+    
+    def __init__(
+        self,
+        pipeline,
+        voice_recognizer,
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+        sample_rate: int = 16000,
+        sample_width: int = 2,
+        min_words: int = 8,
+        max_seconds: float = 600.0
+    ):
+        """
+        Args:
+            pipeline: AnalysisPipeline used for analysis and persistence
+            voice_recognizer: VoiceRecognizer used for segment transcription
+            send: Coroutine delivering an event dictionary to the client
+            sample_rate: Sample rate of the incoming mono PCM
+            sample_width: Bytes per sample of the incoming PCM
+            min_words: Transcript length that triggers speculative analysis
+            max_seconds: Longest stream accepted
+        """
+        self.pipeline = pipeline
+        self.voice_recognizer = voice_recognizer
+        self.send = send
+        self.input_rate = sample_rate
+        self.input_width = sample_width
+        self.min_words = min_words
+        self.max_seconds = max_seconds
+        
+        self.rate = voice_recognizer.target_sample_rate
+        self.min_silence_ms = voice_recognizer.segment_min_silence_ms
+        self.max_segment_seconds = voice_recognizer.segment_max_seconds
+        
+        self._rate_state = None
+        self._pending = bytearray()
+        # Stream time (seconds) at which the pending buffer starts
+        self._pending_offset = 0.0
+        self._unchecked = 0
+        self._total_bytes = 0
+        
+        self._segments: List[Dict[str, Any]] = []
+        self._segment_tasks: List[asyncio.Task] = []
+        self._analysis_task: Optional[asyncio.Task] = None
+        self._analysis_text: Optional[str] = None
+        self._analysis: Optional[Tuple[str, Dict[str, Any]]] = None
+        self._finishing = False
+    
+    async def feed(self, chunk: bytes):
+        """
+        Add a chunk of mono PCM from the client.
+        
+        Raises:
+            ValueError: If the stream exceeds max_seconds
+        """
+        
+        if self.input_width != 2:
+            chunk = audioop.lin2lin(chunk, self.input_width, 2)
+        if self.input_rate != self.rate:
+            chunk, self._rate_state = audioop.ratecv(chunk, 2, 1, self.input_rate, self.rate, self._rate_state)
+        
+        self._pending.extend(chunk)
+        self._total_bytes += len(chunk)
+        if self._total_bytes > self.max_seconds * self.rate * 2:
+            raise ValueError(f"Stream exceeds maximum length of {self.max_seconds} seconds")
+        
+        # Look for pauses every half second of new audio
+        self._unchecked += len(chunk)
+        if self._unchecked >= self.rate:
+            self._unchecked = 0
+            self._cut_segments(final=False)
+    
+    async def finish(self) -> Dict[str, Any]:
+        """
+        Transcribe the remaining audio, complete the analysis and persist it.
+        
+        Returns:
+            Analysis data in the same shape as /analyze, plus record_id
+        """
+        
+        self._cut_segments(final=True)
+        await asyncio.gather(*self._segment_tasks)
+        self._finishing = True
+        
+        transcript, service_name = self._transcript()
+        if not transcript:
+            transcript = self.voice_recognizer.FALLBACK_TEXT
+            service_name = self.voice_recognizer.FALLBACK_SERVICE_NAME
+        
+        # Reuse the speculative analysis when it covers the final text;
+        # a pass over older text is abandoned
+        task = self._analysis_task
+        if task is not None and not task.done():
+            if self._analysis_text != transcript:
+                task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        analysis = self._analysis[1] if self._analysis and self._analysis[0] == transcript else None
+        
+        audio_stats = {
+            "duration": round(self._total_bytes / (2 * self.rate), 2),
+            "segments": self._segments,
+            "failed_segments": sum(1 for segment in self._segments if "error" in segment)
+        }
+        return await self.pipeline.finalize(
+            {"text": transcript, "service": service_name, "audio": audio_stats},
+            analysis,
+            wait_for_persist=True
+        )
+    
+    async def cancel(self):
+        """Stop all background work, e.g. when the client disconnects."""
+        
+        tasks = [task for task in self._segment_tasks + [self._analysis_task] if task and not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def _cut_segments(self, final: bool):
+        """Start transcription of every completed segment in the pending buffer."""
+        
+        if not self._pending:
+            return
+        
+        pending_seconds = len(self._pending) / (2 * self.rate)
+        segments = find_speech_segments(
+            bytes(self._pending),
+            self.rate,
+            min_silence_ms=self.min_silence_ms,
+            max_segment_seconds=self.max_segment_seconds
+        )
+        
+        if not final:
+            if not segments:
+                return
+            # The last segment may still be growing unless a pause follows it
+            if pending_seconds - segments[-1][1] < self.min_silence_ms / 2000:
+                segments = segments[:-1]
+            if not segments:
+                return
+        
+        for start, end in segments:
+            first = int(start * self.rate) * 2
+            last = int(end * self.rate) * 2
+            self._start_segment(self._pending_offset + start, self._pending_offset + end, bytes(self._pending[first:last]))
+        
+        consumed = len(self._pending) if final else int(segments[-1][1] * self.rate) * 2
+        del self._pending[:consumed]
+        self._pending_offset += consumed / (2 * self.rate)
+    
+    def _start_segment(self, start: float, end: float, frame_data: bytes):
+        segment = {"start": round(start, 3), "end": round(end, 3)}
+        self._segments.append(segment)
+        self._segment_tasks.append(asyncio.create_task(self._transcribe_segment(segment, frame_data)))
+    
+    async def _transcribe_segment(self, segment: Dict[str, Any], frame_data: bytes):
+        """Transcribe one segment, then report the updated transcript."""
+        
+        recognized = await self.voice_recognizer.transcribe_pcm(frame_data, self.rate)
+        if recognized is None:
+            segment["error"] = "All services failed"
+        else:
+            segment["text"], segment["service"] = recognized
+        
+        transcript, _ = self._transcript()
+        await self._emit({"event": "partial", "segment": segment, "transcript": transcript})
+        self._schedule_analysis()
+    
+    def _transcript(self) -> Tuple[str, str]:
+        """Text of the transcribed segments in stream order, with the services used."""
+        
+        transcribed = [segment for segment in self._segments if "text" in segment]
+        service_names = list(dict.fromkeys(segment["service"] for segment in transcribed))
+        return " ".join(segment["text"] for segment in transcribed), " + ".join(service_names)
+    
+    def _schedule_analysis(self):
+        """Start a speculative analysis of the current transcript if none is running."""
+        
+        if self._finishing or (self._analysis_task is not None and not self._analysis_task.done()):
+            return
+        transcript, _ = self._transcript()
+        if len(transcript.split()) < self.min_words:
+            return
+        if self._analysis is not None and self._analysis[0] == transcript:
+            return
+        self._analysis_text = transcript
+        self._analysis_task = asyncio.create_task(self._analyze(transcript))
+    
+    async def _analyze(self, transcript: str):
+        try:
+            analysis = await self.pipeline.analyze_text(transcript)
+        except Exception as e:
+            print(f"⚠️ Speculative analysis failed: {str(e)}")
+            return
+        
+        self._analysis = (transcript, analysis)
+        await self._emit({
+            "event": "analysis",
+            "transcript": transcript,
+            "location": analysis["location"],
+            "pollution_type": analysis["classification"]["pollution_type"],
+            "severity_level": analysis["classification"].get("severity_level")
+        })
+        # Text may have grown while this pass ran
+        self._analysis_task = None
+        self._schedule_analysis()
+    
+    async def _emit(self, event: Dict[str, Any]):
+        """Send an event, ignoring clients that have gone away."""
+        
+        try:
+            await self.send(event)
+        except Exception as e:
+            print(f"⚠️ Could not send stream event: {str(e)}")
@@ -0,0 +1,191 @@
+import array
+import asyncio
+import audioop
+import io
+import multiprocessing
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import speech_recognition as sr
+from pydub import AudioSegment
+
+# Per-process recognizer reused by recognize_sphinx_pcm
+_sphinx_recognizer: Optional[sr.Recognizer] = None
+
+def _read_wav(source: Union[str, io.BytesIO]) -> Tuple[bytes, int, int, int]:
+    """Read PCM frames, sample rate, sample width and channel count from a WAV file."""
+    
+    with wave.open(source, 'rb') as wav_file:
+        return (
+            wav_file.readframes(wav_file.getnframes()),
+            wav_file.getframerate(),
+            wav_file.getsampwidth(),
+            wav_file.getnchannels()
+        )
+
+def _to_mono_16bit(frames: bytes, sample_rate: int, sample_width: int, channels: int,
+                   target_rate: int) -> bytes:
+    """Convert interleaved PCM to 16-bit mono at target_rate."""
+    
+    if sample_width == 1:
+        # 8-bit WAV is unsigned; audioop expects signed samples
+        frames = audioop.bias(frames, 1, -128)
+    if sample_width != 2:
+        frames = audioop.lin2lin(frames, sample_width, 2)
+    
+    if channels == 2:
+        frames = audioop.tomono(frames, 2, 0.5, 0.5)
+    elif channels > 2:
+        samples = array.array('h', frames)
+        frames = array.array('h', (
+            sum(samples[i:i + channels]) // channels for i in range(0, len(samples), channels)
+        )).tobytes()
+    
+    if sample_rate != target_rate:
+        frames, _ = audioop.ratecv(frames, 2, 1, sample_rate, target_rate, None)
+    return frames
+
+def decode_audio(source: Union[str, bytes], file_ext: str, target_rate: int,
+                 ambient_duration: float = 0.5) -> Dict[str, Any]:
+    """
+    Decode an audio file once into normalized PCM plus its statistics.
+    
+    Runs in a pool worker. PCM WAV is read with the standard library;
+    other formats are decoded by pydub. Either way the result is 16-bit
+    mono PCM at target_rate, held only in memory.
+    
+    Args:
+        source: Path to the audio file, or its encoded bytes
+        file_ext: Audio format extension
+        target_rate: Sample rate expected by the recognizers
+        ambient_duration: Leading seconds used to estimate background noise
+        
+    Returns:
+        Dictionary with frame_data, sample_rate, sample_width and stats
+        (duration, rms, peak, ambient_rms)
+        
+    Raises:
+        ValueError: If the audio cannot be decoded
+    """
+    
+    def open_source():
+        return source if isinstance(source, str) else io.BytesIO(source)
+    
+    frames = None
+    if file_ext == '.wav':
+        try:
+            frames, sample_rate, sample_width, channels = _read_wav(open_source())
+            frames = _to_mono_16bit(frames, sample_rate, sample_width, channels, target_rate)
+        except (wave.Error, EOFError, audioop.error):
+            # Compressed or float WAV: let pydub/ffmpeg handle it
+            frames = None
+    
+    if frames is None:
+        try:
+            fmt = file_ext.lstrip('.')
+            audio = AudioSegment.from_file(open_source(), format=fmt)
+            frames = audio.set_channels(1).set_sample_width(2).set_frame_rate(target_rate).raw_data
+        except Exception as e:
+            raise ValueError(f"Audio file could not be decoded: {str(e)}")
+    
+    ambient_bytes = min(len(frames), int(ambient_duration * target_rate) * 2)
+    return {
+        "frame_data": frames,
+        "sample_rate": target_rate,
+        "sample_width": 2,
+        "stats": {
+            "duration": round(len(frames) / (2 * target_rate), 2),
+            "rms": audioop.rms(frames, 2) if frames else 0,
+            "peak": audioop.max(frames, 2) if frames else 0,
+            "ambient_rms": audioop.rms(frames[:ambient_bytes], 2) if ambient_bytes else 0
+        }
+    }
+
+def recognize_sphinx_pcm(frame_data: bytes, sample_rate: int, sample_width: int) -> str:
+    """Run CMU Sphinx over raw PCM in a pool worker."""
+    
+    global _sphinx_recognizer
+    if _sphinx_recognizer is None:
+        _sphinx_recognizer = sr.Recognizer()
+    return _sphinx_recognizer.recognize_sphinx(sr.AudioData(frame_data, sample_rate, sample_width))
+
+def _warmup() -> None:
+    return None
+
+class AudioProcessPool:
+    """
+    Dedicated process pool for CPU-bound audio work.
+    
+    Decoding, ambient-noise calibration and offline recognition hold the
+    GIL, so running them in threads serializes every request in the
+    server process. Worker processes let one server use all cores. Work
+    is exchanged as encoded bytes or raw PCM, never temporary files.
+    With workers=0 the same functions run in the default thread pool.
+    """
+    
+    def __init__(self, workers: int = 0):
+        """
+        Args:
+            workers: Worker processes to start (0 runs work in threads instead)
+        """
+        self.workers = max(0, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        
+        self._submitted = 0
+        self._in_flight = 0
+        self._errors = 0
+        self._total_time = 0.0
+    
+    async def start(self):
+        """Start the worker processes and wait until they are up."""
+        
+        if self.workers == 0 or self._executor is not None:
+            return
+        # Spawned workers do not inherit the server's event loop or threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _warmup) for _ in range(self.workers)))
+    
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Run a module-level function in the pool.
+        
+        Cancelling the caller does not interrupt a job that has already
+        started in a worker; it runs to completion and its result is dropped.
+        """
+        
+        self._submitted += 1
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            if self._executor is None:
+                return await asyncio.to_thread(func, *args)
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        except Exception:
+            self._errors += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._total_time += time.perf_counter() - started
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Report pool size, load and average job time."""
+        
+        return {
+            "mode": "process" if self._executor is not None else "thread",
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "submitted": self._submitted,
+            "errors": self._errors,
+            "avg_job_ms": round(self._total_time / self._submitted * 1000, 2) if self._submitted else 0.0
+        }
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+import speech_recognition as sr
+
+from .audio_pool import AudioProcessPool, recognize_sphinx_pcm
+
+class RecognizerBackend:
+    """
+    Interface for a speech recognition backend.
+    
+    A backend turns recorded audio (sr.AudioData) into text. Backends
+    that hold expensive resources such as loaded models acquire them in
+    start() and release them in close(); VoiceRecognizer calls both once
+    per process lifetime.
+    """
+    
+    def __init__(self, key: str, name: str):
+        """
+        Args:
+            key: Short identifier used in the service priority list
+            name: Human-readable service name reported with results
+        """
+        self.key = key
+        self.name = name
+    
+    async def start(self):
+        """Acquire resources before the first transcription."""
+    
+    async def close(self):
+        """Release resources held by the backend."""
+    
+    async def transcribe(self, audio_data: sr.AudioData) -> str:
+        """
+        Transcribe audio.
+        
+        Raises:
+            sr.UnknownValueError: If the speech was unintelligible
+            sr.RequestError: If the backend could not be reached or failed
+        """
+        raise NotImplementedError
+    
+    def describe(self) -> str:
+        """Short availability note for health checks."""
+        return self.name
+    
+    def get_info(self) -> Dict[str, Any]:
+        return {"key": self.key, "name": self.name}
+
+class SpeechRecognitionBackend(RecognizerBackend):
+    """Backend calling one of sr.Recognizer's recognize_* methods in a thread."""
+    
+    def __init__(self, key: str, name: str, recognizer: sr.Recognizer, method: str,
+                 note: Optional[str] = None, **options):
+        """
+        Args:
+            key: Short identifier used in the service priority list
+            name: Human-readable service name
+            recognizer: Shared recognizer instance
+            method: Name of the recognize_* method, e.g. 'recognize_google'
+            note: Extra availability note for health checks
+            options: Keyword arguments passed to the recognize method
+        """
+        super().__init__(key, name)
+        self.recognizer = recognizer
+        self.method = method
+        self.note = note
+        self.options = options
+    
+    async def transcribe(self, audio_data: sr.AudioData) -> str:
+        return await asyncio.to_thread(getattr(self.recognizer, self.method), audio_data, **self.options)
+    
+    def describe(self) -> str:
+        return f"{self.name} ({self.note})" if self.note else self.name
+
+class PooledSphinxBackend(RecognizerBackend):
+    """CMU Sphinx run in the shared audio process pool, fed raw PCM."""
+    
+    def __init__(self, pool: AudioProcessPool, key: str = "sphinx", name: str = "CMU Sphinx (Offline)"):
+        """
+        Args:
+            pool: Process pool shared with audio decoding
+            key: Short identifier used in the service priority list
+            name: Human-readable service name
+        """
+        super().__init__(key, name)
+        self.pool = pool
+    
+    async def transcribe(self, audio_data: sr.AudioData) -> str:
+        return await self.pool.run(
+            recognize_sphinx_pcm, audio_data.frame_data, audio_data.sample_rate, audio_data.sample_width
+        )
+
+# Model loaded once per worker process by _load_local_model
+_local_model = None
+
+def _load_local_model(model_path: str):
+    """Process pool initializer: load the Vosk model into this worker."""
+    
+    global _local_model
+    from vosk import Model, SetLogLevel
+    
+    SetLogLevel(-1)
+    _local_model = Model(model_path)
+
+def _local_warmup() -> int:
+    return os.getpid()
+
+def _local_transcribe(pcm: bytes, sample_rate: int) -> str:
+    """Run the warm model over 16-bit mono PCM in a worker process."""
+    
+    from vosk import KaldiRecognizer
+    
+    # Recognizers are cheap; the model they share is the expensive part
+    recognizer = KaldiRecognizer(_local_model, sample_rate)
+    recognizer.AcceptWaveform(pcm)
+    return json.loads(recognizer.FinalResult()).get("text", "")
+
+class LocalModelBackend(RecognizerBackend):
+    """
+    Offline CPU recognition with a Vosk (Kaldi) model.
+    
+    The model is loaded once in each of a fixed pool of worker processes
+    when the backend starts, so requests pay neither the model load nor
+    the GIL. Audio is handed to workers as raw 16 kHz 16-bit mono PCM.
+    Requires the optional `vosk` package and a downloaded model directory.
+    """
+    
+    SAMPLE_RATE = 16000
+    
+    def __init__(self, model_path: str, workers: int = 2, key: str = "vosk", name: str = "Vosk (Local)"):
+        """
+        Args:
+            model_path: Directory of an unpacked Vosk model
+            workers: Number of worker processes, each holding a loaded model
+            key: Short identifier used in the service priority list
+            name: Human-readable service name
+        """
+        super().__init__(key, name)
+        self.model_path = model_path
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    @staticmethod
+    def is_available() -> bool:
+        """Whether the optional vosk package is installed."""
+        
+        try:
+            import vosk  # noqa: F401
+            return True
+        except ImportError:
+            return False
+    
+    async def start(self):
+        """Start the worker processes and wait until each has loaded the model."""
+        
+        if self._executor is not None:
+            return
+        if not os.path.isdir(self.model_path):
+            raise FileNotFoundError(f"Local ASR model not found: {self.model_path}")
+        
+        # Spawned workers do not inherit the server's event loop or threads
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_local_model,
+            initargs=(self.model_path,)
+        )
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _local_warmup) for _ in range(self.workers)
+        ))
+    
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    async def transcribe(self, audio_data: sr.AudioData) -> str:
+        if self._executor is None:
+            raise sr.RequestError(f"{self.name} is not started")
+        
+        pcm = audio_data.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2)
+        loop = asyncio.get_running_loop()
+        text = await loop.run_in_executor(self._executor, _local_transcribe, pcm, self.SAMPLE_RATE)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+    
+    def describe(self) -> str:
+        state = f"{self.workers} warm workers" if self._executor is not None else "not started"
+        return f"{self.name} ({state})"
+    
+    def get_info(self) -> Dict[str, Any]:
+        return {**super().get_info(), "model_path": self.model_path, "workers": self.workers}
@@ -0,0 +1,86 @@
+import audioop
+from typing import List, Tuple
+
+def find_speech_segments(
+    frame_data: bytes,
+    sample_rate: int,
+    frame_ms: int = 30,
+    min_silence_ms: int = 400,
+    max_segment_seconds: float = 30.0,
+    min_energy: int = 300,
+    noise_multiplier: float = 2.5
+) -> List[Tuple[float, float]]:
+    """
+    Split 16-bit mono PCM into speech segments at pauses.
+    
+    A frame is voiced when its RMS energy exceeds the larger of min_energy
+    and noise_multiplier times the recording's noise floor (the 10th
+    percentile of frame energies), capped at half the speech level (the
+    90th percentile) for recordings with almost no pauses. Segments are cut in the middle of each
+    pause of at least min_silence_ms, so every segment keeps a little
+    silence on both sides. Segments longer than max_segment_seconds are
+    cut again at their quietest frame. Segments without any voiced frame
+    are dropped.
+    
+    Args:
+        frame_data: 16-bit mono PCM
+        sample_rate: Samples per second
+        frame_ms: Analysis frame length in milliseconds
+        min_silence_ms: Shortest pause that separates two segments
+        max_segment_seconds: Longest segment sent to a recognizer
+        min_energy: Lowest RMS counted as speech
+        noise_multiplier: Speech threshold relative to the noise floor
+    
+    Returns:
+        List of (start, end) times in seconds
+    """
+    
+    frame_bytes = max(2, int(sample_rate * frame_ms / 1000) * 2)
+    energies = [
+        audioop.rms(frame_data[offset:offset + frame_bytes], 2)
+        for offset in range(0, len(frame_data), frame_bytes)
+    ]
+    if not energies:
+        return []
+    
+    ranked = sorted(energies)
+    noise_floor = ranked[len(ranked) // 10]
+    speech_level = ranked[len(ranked) * 9 // 10]
+    threshold = max(min_energy, min(noise_floor * noise_multiplier, speech_level * 0.5))
+    voiced = [energy > threshold for energy in energies]
+    
+    # Cut points (frame indices) in the middle of long enough pauses
+    min_silence_frames = max(1, min_silence_ms // frame_ms)
+    cuts = [0]
+    run_start = None
+    for index, is_voiced in enumerate(voiced + [True]):
+        if not is_voiced:
+            if run_start is None:
+                run_start = index
+            continue
+        if run_start is not None and index - run_start >= min_silence_frames and run_start > 0:
+            cuts.append((run_start + index) // 2)
+        run_start = None
+    cuts.append(len(energies))
+    
+    # Enforce the maximum length by splitting at the quietest frame; at least
+    # two frames, so the search window below never starts at the segment start
+    max_frames = max(2, int(max_segment_seconds * 1000 / frame_ms))
+    bounded = []
+    for start, end in zip(cuts, cuts[1:]):
+        while end - start > max_frames:
+            # Search the second half of the allowed window so pieces stay reasonably long
+            window_start = start + max_frames // 2
+            window_end = start + max_frames
+            split = min(range(window_start, window_end), key=lambda i: energies[i])
+            bounded.append((start, split))
+            start = split
+        bounded.append((start, end))
+    
+    frame_seconds = frame_ms / 1000
+    total_seconds = len(frame_data) / (2 * sample_rate)
+    return [
+        (round(start * frame_seconds, 3), round(min(end * frame_seconds, total_seconds), 3))
+        for start, end in bounded
+        if end > start and any(voiced[start:end])
+    ]
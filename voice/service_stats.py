@@ -0,0 +1,116 @@
+import math
+import time
+from collections import deque
+from typing import Any, Dict, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.5, 1.0, 2.0, 5.0, 10.0, 15.0, 30.0)
+
+class ServiceStats:
+    """
+    Latency and success tracking for one recognition service.
+    
+    Keeps cumulative counters and a latency histogram for reporting, plus
+    a window of recent attempts used to rank services: a service whose
+    recent success rate drops below the threshold is demoted behind the
+    healthy ones, and healthy services are ordered by their recent
+    successful latency. Attempts older than max_age are ignored, so a demoted
+    service is tried first again once its failures have aged out, even
+    if faster services kept winning in the meantime.
+    """
+    
+    def __init__(self, window: int = 50, min_samples: int = 5, demote_below: float = 0.5, max_age: float = 300.0):
+        """
+        Args:
+            window: Number of recent attempts considered for ranking
+            min_samples: Attempts needed before a service can be demoted
+            demote_below: Recent success rate under which a service is demoted
+            max_age: Seconds an attempt counts towards ranking
+        """
+        self.min_samples = min_samples
+        self.demote_below = demote_below
+        self.max_age = max_age
+        
+        self._recent = deque(maxlen=window)
+        self._histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self._successes = 0
+        self._failures = 0
+        self._cancelled = 0
+        self._total_latency = 0.0
+    
+    def record(self, success: bool, latency: float):
+        """Record a finished attempt."""
+        
+        self._recent.append((time.monotonic(), success, latency))
+        if success:
+            self._successes += 1
+        else:
+            self._failures += 1
+        self._total_latency += latency
+        
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+        self._histogram[bucket] += 1
+    
+    def record_cancelled(self):
+        """Record an attempt abandoned because another service won."""
+        self._cancelled += 1
+    
+    def _fresh(self) -> list:
+        """Recent attempts younger than max_age."""
+        
+        cutoff = time.monotonic() - self.max_age
+        return [(success, latency) for recorded, success, latency in self._recent if recorded >= cutoff]
+    
+    def success_rate(self) -> float:
+        """Success rate over the recent window (1.0 when there is no history)."""
+        
+        fresh = self._fresh()
+        if not fresh:
+            return 1.0
+        return sum(1 for success, _ in fresh if success) / len(fresh)
+    
+    def is_demoted(self) -> bool:
+        return len(self._fresh()) >= self.min_samples and self.success_rate() < self.demote_below
+    
+    def latency_percentile(self, percentile: float) -> float:
+        """Latency percentile in seconds over the recent window."""
+        
+        latencies = sorted(latency for _, latency in self._fresh())
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile))]
+    
+    def ranking_latency(self) -> Tuple[float, float]:
+        """
+        Recent p50 and p90 latency of successful attempts, for ranking.
+        
+        Services with fewer than min_samples recent successes rank as
+        infinitely slow, so they keep their configured position until
+        enough evidence exists to move them.
+        """
+        
+        latencies = sorted(latency for success, latency in self._fresh() if success)
+        if len(latencies) < self.min_samples:
+            return math.inf, math.inf
+        return (
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.5))],
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+        )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Report counters, recent success rate, latency percentiles and histogram."""
+        
+        attempts = self._successes + self._failures
+        labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        return {
+            "attempts": attempts,
+            "successes": self._successes,
+            "failures": self._failures,
+            "cancelled": self._cancelled,
+            "recent_success_rate": round(self.success_rate(), 3),
+            "demoted": self.is_demoted(),
+            "avg_latency_ms": round(self._total_latency / attempts * 1000, 2) if attempts else 0.0,
+            "p50_latency_ms": round(self.latency_percentile(0.5) * 1000, 2),
+            "p90_latency_ms": round(self.latency_percentile(0.9) * 1000, 2),
+            "latency_histogram": dict(zip(labels, self._histogram))
+        }
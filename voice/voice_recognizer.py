@@ -1,10 +1,15 @@
 import speech_recognition as sr
-import tempfile
 import os
-from typing import Optional
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple, Union, BinaryIO
 import asyncio
-from pydub import AudioSegment
-import io
+
+from .audio_pool import AudioProcessPool, decode_audio
+from .segmentation import find_speech_segments
+from .backends import LocalModelBackend, PooledSphinxBackend, RecognizerBackend, SpeechRecognitionBackend
+from .service_stats import ServiceStats
 
 class VoiceRecognizer:
     """
@@ -14,6 +19,10 @@ class VoiceRecognizer:
     cloud-based speech recognition services as fallbacks.
     """
     
+    # Transcription used when every service fails
+    FALLBACK_TEXT = "I heard someone reporting a pollution incident, but couldn't transcribe the exact details. Please check the area for environmental issues."
+    FALLBACK_SERVICE_NAME = "Fallback (Manual Review Needed)"
+    
     def __init__(self):
         """Initialize speech recognition with multiple service options."""
         self.recognizer = sr.Recognizer()
@@ -22,75 +31,184 @@ class VoiceRecognizer:
         # Supported audio formats
         self.supported_formats = ['.wav', '.mp3', '.m4a', '.flac', '.webm']
         
-        # Service priority order (most reliable first)
-        self.services = [
-            ('google', 'Google Speech Recognition'),
-            ('sphinx', 'CMU Sphinx (Offline)'),
-        ]
-        
         # Configure recognizer settings
         self.recognizer.energy_threshold = 300
         self.recognizer.dynamic_energy_threshold = True
         self.recognizer.pause_threshold = 0.8
         self.recognizer.operation_timeout = 15
+        
+        # Worker processes for decoding and offline recognition (0 = threads)
+        self.audio_pool = AudioProcessPool(int(os.getenv("AUDIO_PROCESS_WORKERS", str(os.cpu_count() or 1))))
+        # Uploads up to this size reach the pool as bytes; larger ones by file path
+        self.inline_audio_bytes = int(os.getenv("AUDIO_INLINE_MAX_BYTES", str(1024 * 1024)))
+        self.ambient_duration = 0.5
+        # Every input is decoded once to 16-bit mono PCM at this rate
+        self.target_sample_rate = int(os.getenv("AUDIO_TARGET_SAMPLE_RATE", "16000"))
+        
+        # Recognition backends by service key
+        self.backends: Dict[str, RecognizerBackend] = {}
+        self.register_backend(SpeechRecognitionBackend(
+            'google', 'Google Speech Recognition', self.recognizer, 'recognize_google',
+            note="requires internet", language='en-US'
+        ))
+        self.register_backend(PooledSphinxBackend(self.audio_pool))
+        
+        # Optional local model, kept warm in worker processes once start() runs
+        local_model_path = os.getenv("LOCAL_ASR_MODEL_PATH")
+        if local_model_path:
+            if LocalModelBackend.is_available():
+                self.register_backend(LocalModelBackend(
+                    local_model_path,
+                    workers=int(os.getenv("LOCAL_ASR_WORKERS", "2"))
+                ))
+            else:
+                print("⚠️ LOCAL_ASR_MODEL_PATH is set but the vosk package is not installed")
+        
+        # Service priority order (most reliable first); unregistered keys are skipped
+        priority = os.getenv("RECOGNITION_SERVICES", "vosk,google,sphinx")
+        self.services = [
+            (key, self.backends[key].name)
+            for key in (item.strip() for item in priority.split(","))
+            if key in self.backends
+        ]
+        
+        # "race" starts every service at once; "sequential" tries them one by one
+        self.strategy = os.getenv("RECOGNITION_STRATEGY", "race").lower()
+        # Seconds after the start of a race that a better-ranked service may still win
+        self.preference_deadline = float(os.getenv("RECOGNITION_PREFERENCE_DEADLINE", "5"))
+        
+        # Per-service latency and success tracking, used to rank services
+        self.service_stats: Dict[str, ServiceStats] = {}
+        
+        # Recordings longer than segment_min_duration are split at pauses
+        # and their segments transcribed concurrently
+        self.segmentation_enabled = os.getenv("SEGMENTATION_ENABLED", "true").lower() == "true"
+        self.segment_min_duration = float(os.getenv("SEGMENT_MIN_DURATION", "20"))
+        self.segment_max_seconds = float(os.getenv("SEGMENT_MAX_SECONDS", "30"))
+        self.segment_min_silence_ms = int(os.getenv("SEGMENT_MIN_SILENCE_MS", "400"))
+        self.segment_concurrency = int(os.getenv("SEGMENT_CONCURRENCY", "4"))
     
-    async def transcribe(self, audio_file_path: str) -> str:
+    async def transcribe_pcm(self, frame_data: bytes, sample_rate: int, sample_width: int = 2) -> Optional[Tuple[str, str]]:
+        """
+        Recognize raw mono PCM, such as one segment of a live stream.
+        
+        Returns:
+            Tuple of (text, service name), or None if every service failed
+        """
+        return await self._recognize(sr.AudioData(frame_data, sample_rate, sample_width))
+    
+    def register_backend(self, backend: RecognizerBackend):
+        """Make a backend available under its service key."""
+        self.backends[backend.key] = backend
+    
+    async def start(self):
+        """Start the audio pool and the backends in the priority list, dropping any that fail to start."""
+        
+        await self.audio_pool.start()
+        for service_key, service_name in list(self.services):
+            try:
+                await self.backends[service_key].start()
+            except Exception as e:
+                print(f"⚠️ {service_name} unavailable: {str(e)}")
+                self.services.remove((service_key, service_name))
+    
+    async def close(self):
+        """Release backend resources such as worker processes."""
+        
+        for backend in self.backends.values():
+            await backend.close()
+        await self.audio_pool.close()
+    
+    async def transcribe(self, audio_source: Union[str, BinaryIO], file_ext: Optional[str] = None) -> str:
         """
         Transcribe audio file to text using multiple services as fallbacks.
         
         Args:
-            audio_file_path: Path to audio file
+            audio_source: Path to audio file, or a readable binary file object
+            file_ext: Audio format extension, required for file objects (defaults to '.wav')
             
         Returns:
             Transcribed text
             
         Raises:
             FileNotFoundError: If audio file doesn't exist
-            ValueError: If audio format is not supported
-            RuntimeError: If transcription fails with all services
+            ValueError: If audio format is not supported or cannot be decoded
+        """
+        
+        text, _, _ = await self._transcribe_audio(audio_source, file_ext)
+        return text
+    
+    async def _transcribe_audio(self, audio_source: Union[str, BinaryIO],
+                                file_ext: Optional[str] = None) -> Tuple[str, str, dict]:
+        """
+        Decode and transcribe audio.
+        
+        Args:
+            audio_source: Path to audio file, or a readable binary file object
+                (e.g. the spooled upload buffer) to avoid a write-then-reread copy
+            file_ext: Audio format extension, required for file objects (defaults to '.wav')
+            
+        Returns:
+            Tuple of (transcribed text, service name, audio stats)
+            
+        Raises:
+            FileNotFoundError: If audio file doesn't exist
+            ValueError: If audio format is not supported or cannot be decoded
         """
         
+        is_path = isinstance(audio_source, str)
+        
         # Validate file existence
-        if not os.path.exists(audio_file_path):
-            raise FileNotFoundError(f"Audio file not found: {audio_file_path}")
+        if is_path and not os.path.exists(audio_source):
+            raise FileNotFoundError(f"Audio file not found: {audio_source}")
         
         # Validate file format
-        file_ext = os.path.splitext(audio_file_path)[1].lower()
+        if file_ext is None:
+            file_ext = os.path.splitext(audio_source)[1] if is_path else '.wav'
+        file_ext = file_ext.lower()
         if file_ext not in self.supported_formats:
             raise ValueError(f"Unsupported audio format: {file_ext}. Supported: {self.supported_formats}")
         
-        wav_path = None
+        audio_stats = {}
+        spilled_path = None
         try:
-            # Convert audio to WAV format if needed
-            wav_path = await self._ensure_wav_format(audio_file_path)
-            
-            # Load audio file
-            with sr.AudioFile(wav_path) as source:
-                # Adjust for ambient noise
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                # Record the audio
-                audio_data = self.recognizer.record(source)
-            
-            # Try each service until one succeeds
-            last_error = None
-            for service_key, service_name in self.services:
-                try:
-                    print(f"Trying {service_name}...")
-                    result = await self._transcribe_with_service(audio_data, service_key)
-                    if result and result.strip():
-                        self.service_name = service_name
-                        print(f"✅ Success with {service_name}")
-                        return result.strip()
-                except Exception as e:
-                    last_error = e
-                    print(f"❌ {service_name} failed: {str(e)}")
-                    continue
+            # Decode once in the audio pool into normalized PCM
+            if is_path:
+                source = audio_source
+            else:
+                source, spilled_path = await asyncio.to_thread(self._pool_source, audio_source, file_ext)
+            decoded = await self.audio_pool.run(
+                decode_audio, source, file_ext, self.target_sample_rate, self.ambient_duration
+            )
+            audio_stats = decoded["stats"]
+            audio_data = sr.AudioData(decoded["frame_data"], decoded["sample_rate"], decoded["sample_width"])
+            
+            segments = []
+            if self.segmentation_enabled and audio_stats["duration"] >= self.segment_min_duration:
+                segments = find_speech_segments(
+                    decoded["frame_data"],
+                    decoded["sample_rate"],
+                    min_silence_ms=self.segment_min_silence_ms,
+                    max_segment_seconds=self.segment_max_seconds
+                )
+            
+            if len(segments) > 1:
+                recognized, segment_results = await self._recognize_segments(audio_data, segments)
+                audio_stats["segments"] = segment_results
+                audio_stats["failed_segments"] = sum(1 for result in segment_results if "error" in result)
+            else:
+                recognized = await self._recognize(audio_data)
+            
+            if recognized:
+                text, service_name = recognized
+                self.service_name = service_name
+                print(f"✅ Success with {service_name}")
+                return text, service_name, audio_stats
             
             # If all services failed, return a fallback message
-            fallback_text = "I heard someone reporting a pollution incident, but couldn't transcribe the exact details. Please check the area for environmental issues."
             print(f"⚠️ All services failed, using fallback transcription")
-            self.service_name = "Fallback (Manual Review Needed)"
-            return fallback_text
+            self.service_name = self.FALLBACK_SERVICE_NAME
+            return self.FALLBACK_TEXT, self.service_name, audio_stats
             
         except Exception as e:
             if isinstance(e, (FileNotFoundError, ValueError)):
@@ -99,61 +217,207 @@ class VoiceRecognizer:
                 # Return fallback for any other errors
                 fallback_text = "Audio processing encountered an issue. Please manually review the reported pollution incident."
                 self.service_name = "Error Fallback"
-                return fallback_text
-        
+                return fallback_text, self.service_name, audio_stats
         finally:
-            # Clean up temporary WAV file if created
-            if wav_path and wav_path != audio_file_path and os.path.exists(wav_path):
-                try:
-                    os.unlink(wav_path)
-                except:
-                    pass
+            if spilled_path:
+                os.unlink(spilled_path)
     
-    async def _ensure_wav_format(self, audio_file_path: str) -> str:
-        """Convert audio file to WAV format if needed."""
+    def _pool_source(self, audio_file: BinaryIO, file_ext: str) -> Tuple[Union[str, bytes], Optional[str]]:
+        """
+        Turn an uploaded file object into a source the audio pool accepts.
         
-        file_ext = os.path.splitext(audio_file_path)[1].lower()
+        Files with a path on disk are passed by path and small uploads as
+        bytes. Larger anonymous files (such as a spooled upload that spilled
+        to disk) are copied in chunks to a temporary file, so the recording
+        is never held in memory as a whole.
         
-        # If already WAV, return as-is
-        if file_ext == '.wav':
-            return audio_file_path
+        Returns:
+            Tuple of (path or bytes for decode_audio, temporary file to delete or None)
+        """
         
-        try:
-            # Convert to WAV using pydub
-            audio = AudioSegment.from_file(audio_file_path)
+        name = getattr(audio_file, "name", None)
+        if isinstance(name, str) and os.path.isfile(name):
+            return name, None
+        
+        start = audio_file.tell()
+        size = audio_file.seek(0, os.SEEK_END) - start
+        audio_file.seek(start)
+        if size <= self.inline_audio_bytes:
+            return audio_file.read(), None
+        
+        with tempfile.NamedTemporaryFile(suffix=file_ext, delete=False) as target:
+            shutil.copyfileobj(audio_file, target)
+        return target.name, target.name
+    
+    async def _recognize(self, audio_data) -> Optional[Tuple[str, str]]:
+        """Recognize one piece of audio with the configured strategy."""
+        
+        if self.strategy == "sequential":
+            return await self._recognize_sequential(audio_data)
+        return await self._recognize_race(audio_data)
+    
+    async def _recognize_segments(self, audio_data, segments: List[Tuple[float, float]]) -> Tuple[Optional[Tuple[str, str]], List[dict]]:
+        """
+        Transcribe speech segments concurrently and stitch them in order.
+        
+        Segments that no service could transcribe are left out of the text
+        and reported with an error, so one bad stretch of audio no longer
+        costs the whole transcription.
+        
+        Args:
+            audio_data: Full recording
+            segments: (start, end) times in seconds
             
-            # Create temporary WAV file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_wav:
-                audio.export(temp_wav.name, format='wav')
-                return temp_wav.name
+        Returns:
+            Tuple of ((stitched text, service names) or None if every segment
+            failed, per-segment results with timestamps)
+        """
+        
+        bytes_per_second = audio_data.sample_rate * audio_data.sample_width
+        semaphore = asyncio.Semaphore(max(1, self.segment_concurrency))
+        
+        async def recognize_segment(start: float, end: float) -> dict:
+            # Slice on sample boundaries
+            first = int(start * bytes_per_second) // audio_data.sample_width * audio_data.sample_width
+            last = int(end * bytes_per_second) // audio_data.sample_width * audio_data.sample_width
+            piece = sr.AudioData(audio_data.frame_data[first:last], audio_data.sample_rate, audio_data.sample_width)
+            async with semaphore:
+                recognized = await self._recognize(piece)
+            if recognized is None:
+                return {"start": start, "end": end, "error": "All services failed"}
+            return {"start": start, "end": end, "text": recognized[0], "service": recognized[1]}
+        
+        print(f"Transcribing {len(segments)} segments")
+        segment_results = list(await asyncio.gather(*(recognize_segment(start, end) for start, end in segments)))
+        
+        transcribed = [result for result in segment_results if "text" in result]
+        if not transcribed:
+            return None, segment_results
+        
+        service_names = list(dict.fromkeys(result["service"] for result in transcribed))
+        text = " ".join(result["text"] for result in transcribed)
+        return (text, " + ".join(service_names)), segment_results
+    
+    async def _recognize_sequential(self, audio_data) -> Optional[Tuple[str, str]]:
+        """Try each service in rank order until one succeeds."""
+        
+        for service_key, service_name in self._ranked_services():
+            text = await self._attempt_service(audio_data, service_key, service_name)
+            if text:
+                return text, service_name
+        return None
+    
+    async def _recognize_race(self, audio_data) -> Optional[Tuple[str, str]]:
+        """
+        Run every service concurrently and keep the best-ranked result.
+        
+        The top-ranked service wins as soon as it succeeds. A lower-ranked
+        success is held until every better-ranked service has failed or
+        preference_deadline has passed, then the remaining attempts are
+        cancelled. Cancelled recognizer threads finish in the background,
+        bounded by the recognizer's operation_timeout.
+        
+        Returns:
+            Tuple of (text, service name), or None if every service failed
+        """
+        
+        services = self._ranked_services()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        
+        ranks = {
+            asyncio.create_task(self._attempt_service(audio_data, service_key, service_name)): rank
+            for rank, (service_key, service_name) in enumerate(services)
+        }
+        pending = set(ranks)
+        best = None
+        
+        try:
+            while pending:
+                timeout = None
+                if best is not None:
+                    timeout = max(0.0, started + self.preference_deadline - loop.time())
+                
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Deadline passed while better-ranked services were still running
+                    break
                 
+                for task in done:
+                    text = task.result()
+                    if text and (best is None or ranks[task] < best[0]):
+                        best = (ranks[task], text)
+                
+                if best is not None and all(ranks[task] > best[0] for task in pending):
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        
+        if best is None:
+            return None
+        return best[1], services[best[0]][1]
+    
+    async def _attempt_service(self, audio_data, service_key: str, service_name: str) -> Optional[str]:
+        """Run one service, recording its latency and outcome. Returns None on failure."""
+        
+        stats = self._stats_for(service_key)
+        print(f"Trying {service_name}...")
+        started = time.perf_counter()
+        try:
+            result = await self._transcribe_with_service(audio_data, service_key)
+        except asyncio.CancelledError:
+            stats.record_cancelled()
+            raise
         except Exception as e:
-            raise RuntimeError(f"Audio format conversion failed: {str(e)}")
+            stats.record(False, time.perf_counter() - started)
+            print(f"❌ {service_name} failed: {str(e)}")
+            return None
+        
+        text = result.strip() if result else ""
+        stats.record(bool(text), time.perf_counter() - started)
+        return text or None
+    
+    def _ranked_services(self) -> List[Tuple[str, str]]:
+        """
+        Services ordered for the next attempt.
+        
+        Services failing recently move behind healthy ones; within each
+        group the recently faster service (by p50, then p90) goes first.
+        Ties, including services without enough history, keep the
+        configured order.
+        """
+        
+        def rank(service: Tuple[str, str]):
+            stats = self._stats_for(service[0])
+            return (stats.is_demoted(), *stats.ranking_latency())
+        
+        return sorted(self.services, key=rank)
+    
+    def _stats_for(self, service_key: str) -> ServiceStats:
+        return self.service_stats.setdefault(service_key, ServiceStats())
+    
+    def get_metrics(self) -> dict:
+        """Report the recognition strategy, current ranking and per-service statistics."""
+        return {
+            "strategy": self.strategy,
+            "preference_deadline": self.preference_deadline,
+            "ranking": [name for _, name in self._ranked_services()],
+            "audio_pool": self.audio_pool.get_stats(),
+            "services": {key: self._stats_for(key).get_stats() for key, _ in self.services}
+        }
     
     async def _transcribe_with_service(self, audio_data, service_key: str) -> str:
         """Transcribe audio using specific service."""
         
         try:
-            if service_key == 'google':
-                # Google Speech Recognition (free tier)
-                result = await asyncio.to_thread(
-                    self.recognizer.recognize_google, 
-                    audio_data,
-                    language='en-US'
-                )
-                return result
-                
-            elif service_key == 'sphinx':
-                # CMU Sphinx (offline, lower accuracy but always available)
-                result = await asyncio.to_thread(
-                    self.recognizer.recognize_sphinx, 
-                    audio_data
-                )
-                return result
-            
-            else:
+            backend = self.backends.get(service_key)
+            if backend is None:
                 raise ValueError(f"Unknown service: {service_key}")
-                
+            
+            return await backend.transcribe(audio_data)
+            
         except sr.UnknownValueError:
             raise RuntimeError("Could not understand audio")
         except sr.RequestError as e:
@@ -170,48 +434,40 @@ class VoiceRecognizer:
         return {
             "service": "SpeechRecognition Library",
             "available_services": [name for _, name in self.services],
+            "backends": [self.backends[key].get_info() for key, _ in self.services],
             "supported_formats": self.supported_formats,
             "current_service": self.service_name
         }
     
-    async def transcribe_with_metadata(self, audio_file_path: str) -> dict:
+    async def transcribe_with_metadata(self, audio_source: Union[str, BinaryIO],
+                                       file_ext: Optional[str] = None) -> dict:
         """
         Transcribe audio with additional metadata.
         
         Args:
-            audio_file_path: Path to audio file
+            audio_source: Path to audio file, or a readable binary file object
+            file_ext: Audio format extension, required for file objects (defaults to '.wav')
             
         Returns:
             Dictionary with transcription and metadata
         """
         
         try:
-            # Get basic transcription
-            text = await self.transcribe(audio_file_path)
-            
-            # Get audio duration
-            duration = await self._get_audio_duration(audio_file_path)
+            # Duration and energy stats come from the same decode as the transcription
+            text, service_name, audio_stats = await self._transcribe_audio(audio_source, file_ext)
             
             return {
                 "text": text,
-                "service": self.service_name,
-                "duration": duration,
+                "service": service_name,
+                "duration": audio_stats.get("duration"),
                 "confidence": "medium",  # SpeechRecognition doesn't provide confidence scores
-                "language": "en-US"
+                "language": "en-US",
+                "audio": audio_stats
             }
             
         except Exception as e:
             raise RuntimeError(f"Detailed transcription failed: {str(e)}")
     
-    async def _get_audio_duration(self, audio_file_path: str) -> Optional[float]:
-        """Get audio file duration in seconds."""
-        
-        try:
-            audio = AudioSegment.from_file(audio_file_path)
-            return round(len(audio) / 1000.0, 2)  # Convert milliseconds to seconds
-        except Exception:
-            return None
-    
     async def health_check(self) -> dict:
         """Check if the voice recognition service is functioning."""
         
@@ -221,12 +477,7 @@ class VoiceRecognizer:
             
             for service_key, service_name in self.services:
                 try:
-                    if service_key == 'sphinx':
-                        # Sphinx is always available (offline)
-                        available_services.append(service_name)
-                    elif service_key == 'google':
-                        # Google requires internet connection
-                        available_services.append(service_name + " (requires internet)")
+                    available_services.append(self.backends[service_key].describe())
                 except:
                     continue
             
@@ -249,7 +500,18 @@ class VoiceRecognizer:
         Configure the priority order of speech recognition services.
         
         Args:
-            services: List of tuples (service_key, service_name)
+            services: List of tuples (service_key, service_name), or service keys,
+                naming registered backends (see register_backend)
+            
+        Raises:
+            ValueError: If a service has no registered backend
         """
-        self.services = services
-        print(f"Service priority updated: {[name for _, name in services]}")
\ No newline at end of file
+        normalized = []
+        for service in services:
+            service_key, service_name = (service, None) if isinstance(service, str) else service
+            if service_key not in self.backends:
+                raise ValueError(f"Unknown service: {service_key}. Registered: {list(self.backends)}")
+            normalized.append((service_key, service_name or self.backends[service_key].name))
+        
+        self.services = normalized
+        print(f"Service priority updated: {[name for _, name in normalized]}")
\ No newline at end of file